@@ -0,0 +1,199 @@
+"""
+Dataset-level statistics for degrees.
+
+Connected components are found with union-find over the casts of every
+movie, in one pass over the graph. The distribution of degrees of
+separation is estimated by sampling: a breadth-first search from each
+randomly chosen source gives its distance to everyone, so a few hundred
+sources sample millions of pairs. Searches run in parallel worker
+processes that memory-map the shared graph snapshot, and the running
+histogram is printed as results stream in.
+
+Each search also gives the eccentricity of its source (its distance to
+the farthest person it reaches). Within a component, the largest
+eccentricity seen is a lower bound on the diameter, twice the smallest
+is an upper bound, and one more search from the farthest person found
+(a "double sweep") usually tightens the lower bound.
+
+Usage: python analytics.py [directory] [--samples N] [--seed N]
+                           [--workers N] [--every N]
+"""
+
+import argparse
+import multiprocessing
+import random
+from array import array
+from collections import Counter
+
+import snapshot
+
+
+def components(graph):
+    """
+    Labels the connected components of `graph` with union-find.
+    Returns an array mapping each person to the root of their component.
+    """
+    parent = array("i", range(len(graph.person_ids)))
+
+    def find(p):
+        while parent[p] != p:
+            # Path halving: point every other person at their grandparent
+            parent[p] = parent[parent[p]]
+            p = parent[p]
+        return p
+
+    size = array("i", [1]) * len(parent)
+    for m in range(len(graph.movie_ids)):
+        stars = graph.stars_of(m)
+        if len(stars) < 2:
+            continue
+        root = find(stars[0])
+        for q in stars[1:]:
+            other = find(q)
+            if other == root:
+                continue
+            # Union by size keeps the trees shallow
+            if size[other] > size[root]:
+                root, other = other, root
+            parent[other] = root
+            size[root] += size[other]
+
+    for p in range(len(parent)):
+        parent[p] = find(p)
+    return parent
+
+
+def sample(source):
+    """
+    Runs a breadth-first search from person `source`.
+    Returns (source, histogram of degrees to every person reached,
+    eccentricity, a farthest person).
+    """
+    distance = snapshot.graph.distances(source)
+    histogram = Counter(distance)
+    del histogram[-1], histogram[0]
+    eccentricity = max(histogram, default=0)
+    farthest = distance.index(eccentricity) if eccentricity else source
+    return source, histogram, eccentricity, farthest
+
+
+class Summary():
+    """
+    Running totals over the sampled searches.
+    """
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.sources = 0
+        self.histogram = Counter()
+        # Per component root: (largest eccentricity, its farthest person)
+        # and the smallest eccentricity
+        self.widest = {}
+        self.narrowest = {}
+
+    def add(self, source, histogram, eccentricity, farthest):
+        self.sources += 1
+        self.histogram.update(histogram)
+        self.bound(source, eccentricity, farthest)
+
+    def bound(self, source, eccentricity, farthest):
+        """
+        Records the eccentricity of `source`, without sampling its pairs.
+        """
+        root = self.labels[source]
+        if eccentricity > self.widest.get(root, (-1, None))[0]:
+            self.widest[root] = (eccentricity, farthest)
+        if eccentricity < self.narrowest.get(root, eccentricity + 1):
+            self.narrowest[root] = eccentricity
+
+    def diameter(self, root):
+        """
+        Returns (lower, upper) bounds on the diameter of the component
+        whose root is `root`, from the searches sampled within it.
+        """
+        return self.widest[root][0], 2 * self.narrowest[root]
+
+    def format_histogram(self):
+        pairs = sum(self.histogram.values())
+        if pairs == 0:
+            return "no connected pairs"
+        mean = sum(d * n for d, n in self.histogram.items()) / pairs
+        shares = " ".join(f"{d}:{100 * n / pairs:.1f}%"
+                          for d, n in sorted(self.histogram.items()))
+        return f"mean {mean:.2f}, {shares}"
+
+
+def run(directory, samples, seed=None, workers=None, every=10):
+    """
+    Prints the components of the dataset in `directory` and the
+    distribution of degrees of separation over `samples` sources.
+    """
+    graph = snapshot.load(directory)
+    n = len(graph.person_ids)
+    if n == 0:
+        print("0 people in 0 connected components.")
+        return
+    labels = components(graph)
+    sizes = Counter(labels)
+    largest, largest_size = sizes.most_common(1)[0]
+    singletons = sum(1 for size in sizes.values() if size == 1)
+    print(f"{n} people in {len(sizes)} connected components; "
+          f"largest has {largest_size} people "
+          f"({100 * largest_size / n:.1f}%), {singletons} have no co-stars.")
+
+    sources = random.Random(seed).sample(range(n), min(samples, n))
+    summary = Summary(labels)
+    if workers == 1:
+        snapshot.init_worker(directory)
+        results = map(sample, sources)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers,
+                                    initializer=snapshot.init_worker,
+                                    initargs=(directory,))
+        results = pool.imap_unordered(sample, sources)
+    try:
+        for result in results:
+            summary.add(*result)
+            if summary.sources % every == 0 or summary.sources == len(sources):
+                print(f"After {summary.sources} sources: "
+                      f"{summary.format_histogram()}", flush=True)
+
+        # Double sweep: search again from the farthest person found in
+        # the largest component, to tighten its diameter's lower bound
+        if largest in summary.widest:
+            farthest = summary.widest[largest][1]
+            result = (pool.apply(sample, (farthest,)) if pool
+                      else sample(farthest))
+            summary.bound(farthest, *result[2:])
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if largest in summary.widest:
+        lower, upper = summary.diameter(largest)
+        print(f"Diameter of the largest component: between {lower} "
+              f"and {upper}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate degrees of "
+                                                 "separation statistics.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--samples", type=int, default=100,
+                        help="number of breadth-first search sources")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--every", type=int, default=10,
+                        help="print the running histogram every N sources")
+    args = parser.parse_args()
+    if args.every < 1:
+        parser.error("--every must be at least 1")
+
+    run(args.directory, args.samples, args.seed, args.workers, args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Answers many degrees queries at once.
+
+Reads (source, target) pairs, one per line separated by a tab, from a
+file or stdin. Each side may be a person_id or an unambiguous name.
+Pairs are grouped by source so that every source needs only one
+breadth-first search, whose tree answers all of that source's targets.
+Source groups are spread over a pool of worker processes, which all
+memory-map the same read-only graph snapshot.
+
+Results are written as JSON lines:
+    {"source": ..., "target": ..., "degrees": 2,
+     "path": [[movie_id, person_id], ...]}
+with "degrees" and "path" set to null when the pair is not connected,
+or {"source": ..., "target": ..., "error": ...} for bad input.
+
+Usage: python batch.py [directory] [pairs] [--output FILE] [--workers N]
+"""
+
+import argparse
+import json
+import multiprocessing
+import sys
+
+import degrees
+import snapshot
+
+
+def resolve(person):
+    """
+    Returns the person_id for a person_id or unambiguous name,
+    or None if there is no single match.
+    """
+    if person in degrees.graph.person_index:
+        return person
+    person_ids = degrees.names.get(person.lower(), set())
+    if len(person_ids) == 1:
+        return next(iter(person_ids))
+    return None
+
+
+def read_pairs(lines):
+    """
+    Groups the pairs in `lines` by source.
+    Returns ({source_id: [target_id, ...]}, [error results]).
+    """
+    groups = {}
+    errors = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line.strip():
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            errors.append({"line": line, "error": "expected two fields"})
+            continue
+        source, target = fields
+        source_id, target_id = resolve(source), resolve(target)
+        if source_id is None or target_id is None:
+            missing = source if source_id is None else target
+            errors.append({"source": source, "target": target,
+                           "error": f"no single person matches {missing!r}"})
+            continue
+        groups.setdefault(source_id, []).append(target_id)
+    return groups, errors
+
+
+def answer(source, targets):
+    """
+    Answers every (source, target) pair for one source with a single
+    breadth-first search. Returns a list of result dicts.
+    """
+    graph = snapshot.graph
+    s = graph.person_index[source]
+    indices = [graph.person_index[target] for target in targets]
+    tree = graph.search_tree(s, indices)
+
+    results = []
+    for target, t in zip(targets, indices):
+        path = graph.path(tree, s, t)
+        if path is None:
+            results.append({"source": source, "target": target,
+                            "degrees": None, "path": None})
+        else:
+            results.append({
+                "source": source, "target": target, "degrees": len(path),
+                "path": [[graph.movie_ids[m], graph.person_ids[q]]
+                         for m, q in path]
+            })
+    return results
+
+
+def answer_group(group):
+    return answer(*group)
+
+
+def run(directory, lines, output, workers=None):
+    """
+    Answers every pair in `lines`, writing JSON lines to `output`.
+    """
+    # Loading once here also builds the snapshot the workers will share
+    degrees.load_data(directory, cached=True)
+    groups, errors = read_pairs(lines)
+    for error in errors:
+        output.write(json.dumps(error) + "\n")
+
+    if workers == 1:
+        snapshot.init_worker(directory)
+        write_results(map(answer_group, groups.items()), output)
+        return
+    with multiprocessing.Pool(workers, initializer=snapshot.init_worker,
+                              initargs=(directory,)) as pool:
+        write_results(pool.imap(answer_group, groups.items()), output)
+
+
+def write_results(groups, output):
+    """
+    Writes each result of each answered group as a JSON line.
+    """
+    for group in groups:
+        for result in group:
+            output.write(json.dumps(result) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer degrees queries "
+                                                 "in bulk.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("pairs", nargs="?", default="-",
+                        help="file of tab-separated pairs, or - for stdin")
+    parser.add_argument("--output", default="-",
+                        help="JSON lines file, or - for stdout")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    pairs = sys.stdin
+    if args.pairs != "-":
+        pairs = open(args.pairs, encoding="utf-8")
+    output = sys.stdout
+    if args.output != "-":
+        output = open(args.output, "w", encoding="utf-8")
+    try:
+        run(args.directory, pairs, output, args.workers)
+    finally:
+        if pairs is not sys.stdin:
+            pairs.close()
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
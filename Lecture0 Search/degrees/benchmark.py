@@ -0,0 +1,219 @@
+"""
+Benchmarks for the degrees search code.
+
+Usage: python benchmark.py search [directory] [--pairs N] [--seed S]
+                                  [--compact]
+       python benchmark.py frontier [--sizes N ...] [--legacy-limit N]
+       python benchmark.py landmarks [directory] [--pairs N] [--count N]
+"""
+
+import argparse
+import random
+import time
+
+import degrees
+import landmarks
+import snapshot
+from util import Node, StackFrontier, QueueFrontier
+
+
+class ListStackFrontier():
+    """
+    The original list-backed frontier, kept here as a baseline.
+    """
+    def __init__(self):
+        self.frontier = []
+
+    def add(self, node):
+        self.frontier.append(node)
+
+    def contains_state(self, state):
+        return any(node.state == state for node in self.frontier)
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        node = self.frontier[-1]
+        self.frontier = self.frontier[:-1]
+        return node
+
+
+class ListQueueFrontier(ListStackFrontier):
+
+    def remove(self):
+        node = self.frontier[0]
+        self.frontier = self.frontier[1:]
+        return node
+
+
+def time_search(search, pairs):
+    """
+    Runs `search` on every (source, target) pair.
+    Returns the list of path lengths (None if not connected),
+    the summed search counters and the wall time in seconds.
+    """
+    lengths = []
+    stats = {}
+    start = time.perf_counter()
+    for source, target in pairs:
+        path = search(source, target, stats=stats)
+        lengths.append(None if path is None else len(path))
+    elapsed = time.perf_counter() - start
+    return lengths, stats, elapsed
+
+
+def print_header():
+    print(f"{'search':<15}{'expanded':>12}{'generated':>12}"
+          f"{'duplicates':>12}{'peak':>10}{'seconds':>10}")
+
+
+def print_row(name, stats, elapsed):
+    print(f"{name:<15}{stats.get('expanded', 0):>12}"
+          f"{stats.get('generated', 0):>12}{stats.get('duplicates', 0):>12}"
+          f"{stats.get('peak_frontier', 0):>10}{elapsed:>10.3f}")
+
+
+def bench_search(args):
+    print("Loading data...")
+    degrees.load_data(args.directory, compact=args.compact)
+    print("Data loaded.")
+
+    rng = random.Random(args.seed)
+    people = sorted(degrees.people)
+    pairs = []
+    while len(pairs) < args.pairs:
+        source, target = rng.choice(people), rng.choice(people)
+        if source != target:
+            pairs.append((source, target))
+
+    searches = [
+        ("bfs", degrees.shortest_path),
+        ("bidirectional", degrees.shortest_path_bidirectional),
+    ]
+    results = {}
+    print_header()
+    for name, search in searches:
+        lengths, stats, elapsed = time_search(search, pairs)
+        results[name] = lengths
+        print_row(name, stats, elapsed)
+
+    if results["bfs"] != results["bidirectional"]:
+        raise AssertionError("searches disagree on path lengths")
+
+
+def time_frontier(frontier_class, size, lookups, rng):
+    """
+    Fills a frontier with `size` nodes, then times `lookups` calls to
+    contains_state and popping every node.
+    Returns (nanoseconds per contains_state, nanoseconds per remove).
+    """
+    frontier = frontier_class()
+    for state in range(size):
+        frontier.add(Node(state, None, None))
+
+    # Half of the lookups hit, half miss
+    states = [rng.randrange(2 * size) for _ in range(lookups)]
+    start = time.perf_counter()
+    for state in states:
+        frontier.contains_state(state)
+    contains = (time.perf_counter() - start) / lookups
+
+    start = time.perf_counter()
+    while not frontier.empty():
+        frontier.remove()
+    remove = (time.perf_counter() - start) / size
+
+    return contains * 1e9, remove * 1e9
+
+
+def bench_frontier(args):
+    rng = random.Random(args.seed)
+    frontiers = [
+        ("StackFrontier", StackFrontier, False),
+        ("QueueFrontier", QueueFrontier, False),
+        ("list stack", ListStackFrontier, True),
+        ("list queue", ListQueueFrontier, True),
+    ]
+    print(f"{'frontier':<15}{'size':>10}{'contains ns':>14}{'remove ns':>12}")
+    for size in args.sizes:
+        for name, frontier_class, legacy in frontiers:
+            if legacy and size > args.legacy_limit:
+                continue
+            # The list frontiers scan on every lookup, so keep them short
+            lookups = min(args.lookups, 100) if legacy else args.lookups
+            contains, remove = time_frontier(
+                frontier_class, size, lookups, rng
+            )
+            print(f"{name:<15}{size:>10}{contains:>14.0f}{remove:>12.0f}")
+
+
+def bench_landmarks(args):
+    print("Building landmark index...")
+    landmarks.build(args.directory, args.count)
+    graph = snapshot.load(args.directory)
+    index = landmarks.LandmarkIndex.load(args.directory, graph)
+    print(f"Index has {len(index.landmarks)} landmarks.")
+
+    rng = random.Random(args.seed)
+    n = len(graph.person_ids)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(args.pairs)]
+
+    results = {}
+    print_header()
+    for name, search in [("bfs", graph.shortest_path),
+                         ("alt", index.shortest_path)]:
+        lengths, stats, elapsed = time_search(search, pairs)
+        results[name] = lengths
+        print_row(name, stats, elapsed)
+    if results["bfs"] != results["alt"]:
+        raise AssertionError("searches disagree on path lengths")
+
+    start = time.perf_counter()
+    exact = 0
+    for source, target in pairs:
+        bounds = index.bounds(source, target)
+        if bounds is None or bounds[0] == bounds[1]:
+            exact += 1
+    elapsed = time.perf_counter() - start
+    print(f"bounds alone answered {exact}/{len(pairs)} pairs "
+          f"in {elapsed:.3f} seconds")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search", help="BFS vs bidirectional BFS")
+    search.add_argument("directory", nargs="?", default="large")
+    search.add_argument("--pairs", type=int, default=100)
+    search.add_argument("--seed", type=int, default=0)
+    search.add_argument("--compact", action="store_true",
+                        help="run over the CSR graph")
+    search.set_defaults(run=bench_search)
+
+    frontier = commands.add_parser("frontier",
+                                   help="frontier pop and contains cost")
+    frontier.add_argument("--sizes", type=int, nargs="+",
+                          default=[10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6])
+    frontier.add_argument("--lookups", type=int, default=10 ** 5)
+    frontier.add_argument("--legacy-limit", type=int, default=10 ** 4,
+                          help="largest size to run the list frontiers at")
+    frontier.add_argument("--seed", type=int, default=0)
+    frontier.set_defaults(run=bench_frontier)
+
+    index = commands.add_parser("landmarks",
+                                help="BFS vs landmark-guided A* search")
+    index.add_argument("directory", nargs="?", default="large")
+    index.add_argument("--pairs", type=int, default=100)
+    index.add_argument("--count", type=int, default=16,
+                       help="number of landmarks")
+    index.add_argument("--seed", type=int, default=0)
+    index.set_defaults(run=bench_landmarks)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
+import argparse
 import csv
 import sys
+from collections import deque
 
-from util import Node, StackFrontier, QueueFrontier
+import landmarks
+import nameindex
+import snapshot
+from graph import Graph
+from util import add_stats
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +18,29 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed graph, set when data is loaded with compact=True
+graph = None
 
-def load_data(directory):
+# Prefix and fuzzy name lookup, set by load_name_index
+name_index = None
+
+
+def load_data(directory, compact=False, cached=False):
     """
     Load data from CSV files into memory.
+
+    With `compact`, the data is held in a CSR Graph instead, and
+    `people` and `movies` become read-only views over it.
+    With `cached`, that Graph is memory-mapped from a binary snapshot
+    of the CSVs, which is rebuilt first if any of them has changed.
     """
+    if cached:
+        load_graph(snapshot.load(directory))
+        return
+    if compact:
+        load_graph(Graph.from_csv(directory))
+        return
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -52,14 +76,60 @@ def load_data(directory):
                 pass
 
 
+def load_graph(loaded):
+    """
+    Makes `loaded` the graph backing `names`, `people` and `movies`.
+    """
+    global graph, people, movies
+    graph = loaded
+    people = graph.people_view()
+    movies = graph.movies_view()
+    names.clear()
+    for person_id, name in zip(graph.person_ids, graph.person_names):
+        names.setdefault(name.lower(), set()).add(person_id)
+
+
+def load_name_index(directory):
+    """
+    Loads (building it first if needed) the prefix and fuzzy name
+    index for the data loaded from `directory`.
+    """
+    global name_index
+
+    def entries():
+        if graph is not None:
+            return nameindex.graph_entries(graph)
+        return ((person_id, person["name"], len(person["movies"]))
+                for person_id, person in people.items())
+
+    name_index = nameindex.load(directory, entries)
+
+
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(usage="python degrees.py [directory]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both ends and meet in the middle")
+    parser.add_argument("--compact", action="store_true",
+                        help="hold the data in a compact CSR graph")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load the compact graph from a binary snapshot")
+    parser.add_argument("--suggest", action="store_true",
+                        help="suggest similar names when a name is not found")
+    parser.add_argument("--landmarks", action="store_true",
+                        help="guide the search with the landmark index "
+                             "(built by landmarks.py; implies --snapshot)")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, compact=args.compact,
+              cached=args.snapshot or args.landmarks)
+    index = None
+    if args.landmarks:
+        index = landmarks.LandmarkIndex.load(args.directory, graph)
+    if args.suggest:
+        load_name_index(args.directory)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +139,16 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if index is not None:
+        path = index.shortest_path(graph.person_index[source],
+                                   graph.person_index[target])
+        if path is not None:
+            path = [(graph.movie_ids[m], graph.person_ids[q])
+                    for m, q in path]
+    elif args.bidirectional:
+        path = shortest_path_bidirectional(source, target)
+    else:
+        path = shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -84,41 +163,154 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    If `stats` is a dict, the search counters are added to it:
+    expanded (people dequeued), generated (co-star pairs looked at),
+    duplicates (pairs skipped because the person was already seen)
+    and peak_frontier (largest number of people waiting at once).
     """
-    # TODO
-    res = []
-    Queue = QueueFrontier()
-    start = Node(source, None, None)
-    Queue.add(start)
-    Explored_set = set()
-    while True:
-        if Queue.empty():
+    if graph is not None:
+        path = graph.shortest_path(graph.person_index[source],
+                                   graph.person_index[target], stats)
+        if path is None:
             return None
-        
-        node = Queue.remove()
-        state = node.state
-        Explored_set.add(state)
-        
-        for movie in people[state]['movies']:
-            for person in movies[movie]['stars']:
-                if person not in Explored_set:
-                    if person == target:
-                        res.append((movie, person))
-                        while node.parent is not None:
-                            res.append((node.action, node.state))
-                            node = node.parent
-                        res.reverse()
-                        
-                        return res
-                    else:
-                        child = Node(person, node, movie)
-                        Queue.add(child)
+        return [(graph.movie_ids[m], graph.person_ids[q]) for m, q in path]
+
+    if source == target:
+        return []
+
+    # Maps each person seen so far to (movie_id, previous person).
+    # People are marked as seen when they are enqueued, so nobody is
+    # queued twice, and the goal test happens as soon as the target
+    # is generated rather than when it is dequeued.
+    parents = {source: None}
+    # A movie's cast only needs to be scanned the first time it comes up
+    scanned = set()
+    queue = deque([source])
+    expanded = generated = duplicates = 0
+    peak_frontier = 1
+
+    path = None
+    while queue and path is None:
+        person = queue.popleft()
+        expanded += 1
+        for movie_id in people[person]["movies"]:
+            if movie_id in scanned:
+                continue
+            scanned.add(movie_id)
+            for person_id in movies[movie_id]["stars"]:
+                generated += 1
+                if person_id in parents:
+                    duplicates += 1
+                    continue
+                parents[person_id] = (movie_id, person)
+                if person_id == target:
+                    path = follow_parents(parents, target)
+                    break
+                queue.append(person_id)
+            if path is not None:
+                break
+        peak_frontier = max(peak_frontier, len(queue))
+
+    add_stats(stats, expanded=expanded, generated=generated,
+              duplicates=duplicates, peak_frontier=peak_frontier)
+    return path
+
+
+def follow_parents(parents, person):
+    """
+    Returns the (movie_id, person_id) pairs leading to `person`,
+    following a map of person -> (movie_id, previous person) back
+    to the person whose entry is None.
+    """
+    path = []
+    while parents[person] is not None:
+        movie_id, previous = parents[person]
+        path.append((movie_id, person))
+        person = previous
+    path.reverse()
+    return path
+
+
+def shortest_path_bidirectional(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both
+    ends at once and stopping when the two searches meet.
+
+    If no possible path, returns None.
+
+    If `stats` is a dict, the same counters as shortest_path are
+    added to it.
+    """
+    if source == target:
+        return []
+
+    # Maps each person reached from the source to (movie_id, previous person)
+    forward = {source: None}
+    # Maps each person reached from the target to (movie_id, next person)
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+    expanded = generated = duplicates = 0
+    peak_frontier = 2
+
+    meet = None
+    while forward_layer and backward_layer:
+        # Always grow the smaller side by one whole layer, so that every
+        # meeting point found in this layer gives a path of the same length
+        if len(forward_layer) <= len(backward_layer):
+            layer, parents, others = forward_layer, forward, backward
+        else:
+            layer, parents, others = backward_layer, backward, forward
+
+        next_layer = []
+        for person in layer:
+            expanded += 1
+            for movie_id, person_id in neighbors_for_person(person):
+                generated += 1
+                if person_id in parents:
+                    duplicates += 1
+                    continue
+                parents[person_id] = (movie_id, person)
+                if person_id in others:
+                    meet = person_id
+                    break
+                next_layer.append(person_id)
+            if meet is not None:
+                break
+
+        if meet is not None:
+            break
+        if layer is forward_layer:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+        peak_frontier = max(peak_frontier,
+                            len(forward_layer) + len(backward_layer))
+
+    add_stats(stats, expanded=expanded, generated=generated,
+              duplicates=duplicates, peak_frontier=peak_frontier)
+    if meet is None:
+        return None
+
+    # Walk from the source to the meeting point...
+    path = follow_parents(forward, meet)
+
+    # ...then on from the meeting point to the target
+    person = meet
+    while backward[person] is not None:
+        movie_id, following = backward[person]
+        path.append((movie_id, following))
+        person = following
+    return path
+
 
 def person_id_for_name(name):
     """
@@ -127,30 +319,50 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        # Offer the closest names instead, when the name index is loaded
+        if name_index is not None:
+            suggestions = name_index.fuzzy(name, limit=5)
+            if suggestions:
+                print(f"No '{name}' found. Did you mean:")
+                return choose_person(suggestions)
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
-        for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
-            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
-        try:
-            person_id = input("Intended Person ID: ")
-            if person_id in person_ids:
-                return person_id
-        except ValueError:
-            pass
-        return None
+        return choose_person(person_ids)
     else:
         return person_ids[0]
 
 
+def choose_person(person_ids):
+    """
+    Lists the given people and asks which one is intended.
+    Returns the chosen person_id, or None.
+    """
+    for person_id in person_ids:
+        person = people[person_id]
+        name = person["name"]
+        birth = person["birth"]
+        print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+    try:
+        person_id = input("Intended Person ID: ")
+        if person_id in person_ids:
+            return person_id
+    except ValueError:
+        pass
+    return None
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[m], graph.person_ids[q])
+            for m, q in graph.neighbors(graph.person_index[person_id])
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
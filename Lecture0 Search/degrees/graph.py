@@ -0,0 +1,530 @@
+"""
+Compact, integer-indexed representation of the person-movie graph.
+
+People and movies are numbered densely from 0, and the bipartite graph
+between them is stored twice in CSR (compressed sparse row) form:
+
+    person_movies[person_offsets[p]:person_offsets[p + 1]]
+        are the indices of the movies person p starred in, and
+
+    movie_stars[movie_offsets[m]:movie_offsets[m + 1]]
+        are the indices of the people who starred in movie m.
+
+All four are flat `array.array`s, so the graph costs a few bytes per
+edge instead of a Python set entry per edge.
+
+People, movies and stars added after loading (see add_person,
+add_movie and add_star) are kept in small per-row overlays next to the
+CSR arrays, which may be read-only memory maps, until compact() merges
+them in.
+"""
+
+import csv
+from array import array
+from collections.abc import Mapping, Sequence
+from functools import cached_property
+
+from util import add_stats
+
+
+def build_csr(rows, cols, n):
+    """
+    Builds CSR (offsets, indices) arrays for `n` rows from parallel
+    arrays of row and column indices, dropping duplicate edges.
+    Indices within each row are sorted.
+    """
+    counts = array("q", bytes(8 * (n + 1)))
+    for r in rows:
+        counts[r + 1] += 1
+    for i in range(n):
+        counts[i + 1] += counts[i]
+
+    indices = array("i", bytes(4 * len(rows)))
+    position = array("q", counts)
+    for r, c in zip(rows, cols):
+        indices[position[r]] = c
+        position[r] += 1
+
+    # Sort each row and squeeze out repeated (row, column) pairs
+    offsets = array("q", [0])
+    unique = array("i")
+    for i in range(n):
+        row = sorted(set(indices[counts[i]:counts[i + 1]]))
+        unique.extend(row)
+        offsets.append(len(unique))
+    return offsets, unique
+
+
+class Growable(Sequence):
+    """
+    Sequence that can be appended to and assigned into, layered over a
+    read-only base sequence.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.changed = {}
+        self.tail = []
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if i in self.changed:
+            return self.changed[i]
+        if i < len(self.base):
+            return self.base[i]
+        return self.tail[i - len(self.base)]
+
+    def __setitem__(self, i, value):
+        if i < len(self.base):
+            self.changed[i] = value
+        else:
+            self.tail[i - len(self.base)] = value
+
+    def __len__(self):
+        return len(self.base) + len(self.tail)
+
+    def append(self, value):
+        self.tail.append(value)
+
+
+def growable(sequence):
+    """
+    Returns `sequence` if it is a list, or a Growable over it.
+    """
+    if isinstance(sequence, (list, Growable)):
+        return sequence
+    return Growable(sequence)
+
+
+class Graph():
+    """
+    Person-movie graph over dense integer indices.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        # Movies and stars added after loading, by person and by movie
+        self.extra_movies = {}
+        self.extra_stars = {}
+        # Bumped on every change, so indexes built over the graph
+        # can tell that they are out of date
+        self.version = 0
+
+    @cached_property
+    def person_index(self):
+        """
+        Maps person_ids to person indices.
+        """
+        return {person_id: i for i, person_id in enumerate(self.person_ids)}
+
+    @cached_property
+    def movie_index(self):
+        """
+        Maps movie_ids to movie indices.
+        """
+        return {movie_id: i for i, movie_id in enumerate(self.movie_ids)}
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Loads the graph from people.csv, movies.csv and stars.csv.
+        """
+        person_ids, person_names, person_births = [], [], []
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            id_, name, birth = (header.index(column)
+                                for column in ("id", "name", "birth"))
+            seen = {}
+            for row in reader:
+                # Later rows overwrite earlier ones, as they do in load_data
+                if row[id_] in seen:
+                    i = seen[row[id_]]
+                    person_names[i], person_births[i] = row[name], row[birth]
+                    continue
+                seen[row[id_]] = len(person_ids)
+                person_ids.append(row[id_])
+                person_names.append(row[name])
+                person_births.append(row[birth])
+
+        movie_ids, movie_titles, movie_years = [], [], []
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            id_, title, year = (header.index(column)
+                                for column in ("id", "title", "year"))
+            seen = {}
+            for row in reader:
+                if row[id_] in seen:
+                    i = seen[row[id_]]
+                    movie_titles[i], movie_years[i] = row[title], row[year]
+                    continue
+                seen[row[id_]] = len(movie_ids)
+                movie_ids.append(row[id_])
+                movie_titles.append(row[title])
+                movie_years.append(row[year])
+
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        edge_people, edge_movies = array("i"), array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            person, movie = (header.index(column)
+                             for column in ("person_id", "movie_id"))
+            for row in reader:
+                p = person_index.get(row[person])
+                m = movie_index.get(row[movie])
+                # Skip stars rows that refer to unknown people or movies
+                if p is None or m is None:
+                    continue
+                edge_people.append(p)
+                edge_movies.append(m)
+
+        person_offsets, person_movies = build_csr(
+            edge_people, edge_movies, len(person_ids)
+        )
+        movie_offsets, movie_stars = build_csr(
+            edge_movies, edge_people, len(movie_ids)
+        )
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   person_offsets, person_movies, movie_offsets, movie_stars)
+
+    def movies_of(self, p):
+        """
+        Returns the indices of the movies person `p` starred in.
+        """
+        movies = ()
+        if p < len(self.person_offsets) - 1:
+            movies = self.person_movies[
+                self.person_offsets[p]:self.person_offsets[p + 1]
+            ]
+        extra = self.extra_movies.get(p)
+        return movies if extra is None else list(movies) + extra
+
+    def stars_of(self, m):
+        """
+        Returns the indices of the people who starred in movie `m`.
+        """
+        stars = ()
+        if m < len(self.movie_offsets) - 1:
+            stars = self.movie_stars[
+                self.movie_offsets[m]:self.movie_offsets[m + 1]
+            ]
+        extra = self.extra_stars.get(m)
+        return stars if extra is None else list(stars) + extra
+
+    def movie_count(self, p):
+        """
+        Returns the number of movies person `p` starred in.
+        """
+        return len(self.movies_of(p))
+
+    def cast_size(self, m):
+        """
+        Returns the number of people who starred in movie `m`.
+        """
+        return len(self.stars_of(m))
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person, or updates the name and birth of a known one.
+        Returns the person's index.
+        """
+        p = self.person_index.get(person_id)
+        if p is None:
+            self.person_ids = growable(self.person_ids)
+            self.person_names = growable(self.person_names)
+            self.person_births = growable(self.person_births)
+            p = len(self.person_ids)
+            self.person_ids.append(person_id)
+            self.person_names.append(name)
+            self.person_births.append(birth)
+            self.person_index[person_id] = p
+        else:
+            self.person_names = growable(self.person_names)
+            self.person_births = growable(self.person_births)
+            self.person_names[p] = name
+            self.person_births[p] = birth
+        self.version += 1
+        return p
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie, or updates the title and year of a known one.
+        Returns the movie's index.
+        """
+        m = self.movie_index.get(movie_id)
+        if m is None:
+            self.movie_ids = growable(self.movie_ids)
+            self.movie_titles = growable(self.movie_titles)
+            self.movie_years = growable(self.movie_years)
+            m = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+            self.movie_titles.append(title)
+            self.movie_years.append(year)
+            self.movie_index[movie_id] = m
+        else:
+            self.movie_titles = growable(self.movie_titles)
+            self.movie_years = growable(self.movie_years)
+            self.movie_titles[m] = title
+            self.movie_years[m] = year
+        self.version += 1
+        return m
+
+    def add_star(self, p, m):
+        """
+        Records that person `p` starred in movie `m`.
+        Returns False if that was already known.
+        """
+        if m in self.movies_of(p):
+            return False
+        self.extra_movies.setdefault(p, []).append(m)
+        self.extra_stars.setdefault(m, []).append(p)
+        self.version += 1
+        return True
+
+    def compact(self):
+        """
+        Merges the rows added since loading into fresh CSR arrays.
+        """
+        if (not self.extra_movies
+                and len(self.person_offsets) == len(self.person_ids) + 1
+                and len(self.movie_offsets) == len(self.movie_ids) + 1):
+            return
+        person_offsets, person_movies = array("q", [0]), array("i")
+        for p in range(len(self.person_ids)):
+            person_movies.extend(sorted(self.movies_of(p)))
+            person_offsets.append(len(person_movies))
+        movie_offsets, movie_stars = array("q", [0]), array("i")
+        for m in range(len(self.movie_ids)):
+            movie_stars.extend(sorted(self.stars_of(m)))
+            movie_offsets.append(len(movie_stars))
+        self.person_offsets, self.person_movies = person_offsets, person_movies
+        self.movie_offsets, self.movie_stars = movie_offsets, movie_stars
+        self.extra_movies = {}
+        self.extra_stars = {}
+
+    def neighbors(self, p):
+        """
+        Returns (movie index, person index) pairs for people
+        who starred with person `p`.
+        """
+        return [(m, q) for m in self.movies_of(p) for q in self.stars_of(m)]
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie index, person index) pairs
+        that connect person `source` to person `target`, searching
+        breadth-first directly over the CSR arrays.
+
+        If no possible path, returns None.
+
+        If `stats` is a dict, the search counters are added to it
+        (see degrees.shortest_path).
+        """
+        tree = self.search_tree(source, [target], stats)
+        return self.path(tree, source, target)
+
+    def search_tree(self, source, targets=None, stats=None):
+        """
+        Runs a breadth-first search from person `source` and returns its
+        search tree as a pair of arrays (parent person, parent movie),
+        with -1 for people that were not reached.
+
+        If `targets` is given, the search stops as soon as all of them
+        have been reached; otherwise it covers the whole component.
+
+        If `stats` is a dict, the search counters are added to it.
+        """
+        # parent_person[q] == -1 means q has not been reached yet
+        parent_person = array("i", [-1]) * len(self.person_ids)
+        parent_movie = array("i", [-1]) * len(self.person_ids)
+        # A movie's cast only ever needs to be scanned once
+        movie_seen = bytearray(len(self.movie_ids))
+        parent_person[source] = source
+
+        pending = None
+        if targets is not None:
+            pending = set(targets)
+            pending.discard(source)
+
+        counts = dict(expanded=0, generated=0, duplicates=0, peak_frontier=1)
+        layer = [source]
+        while layer and (pending is None or pending):
+            layer = self._expand_layer(layer, parent_person, parent_movie,
+                                       movie_seen, pending, counts)
+
+        add_stats(stats, **counts)
+        return parent_person, parent_movie
+
+    def distances(self, source, stats=None):
+        """
+        Returns an array of the degrees of separation between person
+        `source` and every person, with -1 for people not connected.
+        """
+        parent_person = array("i", [-1]) * len(self.person_ids)
+        parent_movie = array("i", [-1]) * len(self.person_ids)
+        movie_seen = bytearray(len(self.movie_ids))
+        parent_person[source] = source
+        distance = array("h", [-1]) * len(self.person_ids)
+        distance[source] = 0
+
+        counts = dict(expanded=0, generated=0, duplicates=0, peak_frontier=1)
+        degree = 0
+        layer = [source]
+        while layer:
+            layer = self._expand_layer(layer, parent_person, parent_movie,
+                                       movie_seen, None, counts)
+            degree += 1
+            for q in layer:
+                distance[q] = degree
+
+        add_stats(stats, **counts)
+        return distance
+
+    def _expand_layer(self, layer, parent_person, parent_movie, movie_seen,
+                      pending, counts):
+        """
+        Expands every person in `layer`, recording parents for newly
+        reached people, and returns the next layer. Stops early once
+        `pending` targets have all been reached. People are marked as
+        reached when they are generated, so nobody is queued twice.
+        Adds to the search counters in `counts`.
+        """
+        movies_of = self.movies_of
+        stars_of = self.stars_of
+
+        expanded = generated = 0
+        next_layer = []
+        for p in layer:
+            expanded += 1
+            for m in movies_of(p):
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                stars = stars_of(m)
+                generated += len(stars)
+                for q in stars:
+                    if parent_person[q] != -1:
+                        continue
+                    parent_person[q] = p
+                    parent_movie[q] = m
+                    next_layer.append(q)
+                    if pending and q in pending:
+                        pending.discard(q)
+                        if not pending:
+                            # The rest of this cast was never looked at
+                            generated -= len(stars) - list(stars).index(q) - 1
+                            break
+                if pending is not None and not pending:
+                    break
+            if pending is not None and not pending:
+                break
+
+        counts["expanded"] += expanded
+        counts["generated"] += generated
+        # Every generated person was either new or a duplicate
+        counts["duplicates"] += generated - len(next_layer)
+        counts["peak_frontier"] = max(counts["peak_frontier"],
+                                      len(next_layer))
+        return next_layer
+
+    @staticmethod
+    def path(tree, source, target):
+        """
+        Returns the list of (movie index, person index) pairs leading
+        from `source` to `target` in a tree built by search_tree, or
+        None if the search did not reach `target`.
+        """
+        parent_person, parent_movie = tree
+        if parent_person[target] == -1:
+            return None
+        path = []
+        q = target
+        while q != source:
+            path.append((parent_movie[q], q))
+            q = parent_person[q]
+        path.reverse()
+        return path
+
+    def people_view(self):
+        """
+        Returns a read-only mapping with the same shape as degrees.people.
+        """
+        return PeopleView(self)
+
+    def movies_view(self):
+        """
+        Returns a read-only mapping with the same shape as degrees.movies.
+        """
+        return MoviesView(self)
+
+
+class PeopleView(Mapping):
+    """
+    Maps person_ids to a dictionary of: name, birth, movies (a set of
+    movie_ids), built on demand from a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        p = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[p],
+            "birth": graph.person_births[p],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(p)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Maps movie_ids to a dictionary of: title, year, stars (a set of
+    person_ids), built on demand from a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        m = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[m],
+            "year": graph.movie_years[m],
+            "stars": {graph.person_ids[q] for q in graph.stars_of(m)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
@@ -0,0 +1,140 @@
+"""
+Incremental ingestion of new people, movies and stars rows.
+
+Applies rows appended to people.csv, movies.csv and stars.csv to the
+data already loaded by degrees.load_data, whether it is held in dicts
+or in a (possibly memory-mapped) compact Graph, without reloading
+anything. The name index in degrees.names, and the prefix and fuzzy
+name index in degrees.name_index when it is loaded, are updated as rows
+arrive; movie counts per person and cast sizes per movie are derived
+from the loaded data itself, so they always agree with it.
+
+Rows are dicts with the same columns as the CSV files, so a delta can
+be streamed straight from csv.DictReader.
+"""
+
+import csv
+import os
+
+import degrees
+
+
+def add_person(row):
+    """
+    Adds the person in a people.csv row, or updates their name and
+    birth if their id is already known.
+    """
+    person_id, name, birth = row["id"], row["name"], row["birth"]
+    graph = degrees.graph
+    if graph is not None:
+        p = graph.person_index.get(person_id)
+        old_name = None if p is None else graph.person_names[p]
+        graph.add_person(person_id, name, birth)
+        count = graph.movie_count(graph.person_index[person_id])
+    else:
+        person = degrees.people.get(person_id)
+        old_name = None if person is None else person["name"]
+        if person is None:
+            degrees.people[person_id] = {
+                "name": name,
+                "birth": birth,
+                "movies": set()
+            }
+        else:
+            person["name"] = name
+            person["birth"] = birth
+        count = len(degrees.people[person_id]["movies"])
+
+    # Keep the name index pointing at the person's current name only
+    if old_name is not None and old_name.lower() != name.lower():
+        person_ids = degrees.names.get(old_name.lower(), set())
+        person_ids.discard(person_id)
+        if not person_ids:
+            degrees.names.pop(old_name.lower(), None)
+    degrees.names.setdefault(name.lower(), set()).add(person_id)
+    if degrees.name_index is not None:
+        degrees.name_index.add(person_id, name, count)
+
+
+def add_movie(row):
+    """
+    Adds the movie in a movies.csv row, or updates its title and year
+    if its id is already known.
+    """
+    movie_id, title, year = row["id"], row["title"], row["year"]
+    graph = degrees.graph
+    if graph is not None:
+        graph.add_movie(movie_id, title, year)
+        return
+    movie = degrees.movies.get(movie_id)
+    if movie is None:
+        degrees.movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
+    else:
+        movie["title"] = title
+        movie["year"] = year
+
+
+def add_star(row):
+    """
+    Links the person and movie in a stars.csv row.
+    Returns False if either is unknown or they were already linked.
+    """
+    person_id, movie_id = row["person_id"], row["movie_id"]
+    graph = degrees.graph
+    if graph is not None:
+        p = graph.person_index.get(person_id)
+        m = graph.movie_index.get(movie_id)
+        if p is None or m is None or not graph.add_star(p, m):
+            return False
+        count = graph.movie_count(p)
+    else:
+        if person_id not in degrees.people or movie_id not in degrees.movies:
+            return False
+        movies = degrees.people[person_id]["movies"]
+        if movie_id in movies:
+            return False
+        movies.add(movie_id)
+        degrees.movies[movie_id]["stars"].add(person_id)
+        count = len(movies)
+
+    if degrees.name_index is not None:
+        degrees.name_index.set_film_count(person_id, count)
+    return True
+
+
+def apply_rows(people=(), movies=(), stars=()):
+    """
+    Applies iterables of people, movies and stars rows, in that order.
+    Returns a dict counting the rows applied and the new stars links.
+    """
+    counts = {"people": 0, "movies": 0, "stars": 0}
+    for row in people:
+        add_person(row)
+        counts["people"] += 1
+    for row in movies:
+        add_movie(row)
+        counts["movies"] += 1
+    for row in stars:
+        if add_star(row):
+            counts["stars"] += 1
+    return counts
+
+
+def apply_delta(directory):
+    """
+    Applies the people.csv, movies.csv and stars.csv files found in
+    `directory` (any of them may be missing) to the loaded data.
+    Returns the counts from apply_rows.
+    """
+    counts = {"people": 0, "movies": 0, "stars": 0}
+    for name in ("people", "movies", "stars"):
+        path = os.path.join(directory, f"{name}.csv")
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            counts[name] = apply_rows(**{name: csv.DictReader(f)})[name]
+    return counts
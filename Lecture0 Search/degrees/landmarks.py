@@ -0,0 +1,312 @@
+"""
+Landmark distance index for degrees.
+
+A few well-connected people are chosen as landmarks, and the degrees of
+separation from each landmark to everyone else are stored on disk. By
+the triangle inequality, for any landmark L and people s and t:
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+so the index bounds any distance without searching. When the bounds
+meet the answer is exact; otherwise the lower bound is an admissible,
+consistent heuristic for an A* search (the ALT algorithm), which
+explores far fewer people than breadth-first search.
+
+Each landmark is saved in its own file under <directory>/landmarks,
+tagged with the checksum of the CSVs, so building is incremental: only
+missing or out-of-date landmarks are searched, in parallel.
+
+Usage: python landmarks.py [directory] [--count N] [--workers N]
+"""
+
+import argparse
+import heapq
+import mmap
+import multiprocessing
+import os
+import struct
+from array import array
+
+import snapshot
+from util import add_stats
+
+MAGIC = b"DEGLMK\0\0"
+VERSION = 1
+DIRECTORY = "landmarks"
+
+# Number of landmarks consulted by each search's heuristic
+ACTIVE = 8
+
+# magic, version, checksum of the CSVs
+HEADER = struct.Struct("<8sI32s")
+
+
+def choose(graph, count):
+    """
+    Returns the indices of the `count` people with the most co-star
+    links (counted with repeats across movies), best connected first.
+    """
+    cast_size = [graph.cast_size(m) for m in range(len(graph.movie_ids))]
+    degree = [
+        sum(cast_size[m] for m in graph.movies_of(p))
+        for p in range(len(graph.person_ids))
+    ]
+    return heapq.nlargest(count, range(len(degree)), key=degree.__getitem__)
+
+
+def landmark_path(directory, person_id):
+    """
+    Returns the path of the distance file for landmark `person_id`.
+    """
+    return os.path.join(directory, DIRECTORY, f"{person_id}.dist")
+
+
+def write(path, digest, distance):
+    """
+    Saves one landmark's distance array, tagged with `digest`.
+    """
+    with snapshot.atomic_file(path) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, digest))
+        f.write(distance)
+
+
+def read(path, digest, size):
+    """
+    Memory-maps one landmark's distance array.
+    Returns None if the file is missing, unreadable or stale.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(buffer) != HEADER.size + 2 * size:
+        return None
+    if HEADER.unpack_from(buffer) != (MAGIC, VERSION, digest):
+        return None
+    return memoryview(buffer)[HEADER.size:].cast("h")
+
+
+def build_one(task):
+    """
+    Runs one landmark's breadth-first search and saves the result.
+    """
+    directory, digest, landmark = task
+    graph = snapshot.graph
+    distance = graph.distances(landmark)
+    write(landmark_path(directory, graph.person_ids[landmark]), digest,
+          distance)
+    return landmark
+
+
+def build(directory, count, workers=None):
+    """
+    Makes sure the `count` best-connected people of the dataset in
+    `directory` have up-to-date distance files, searching only the
+    ones that are missing. Returns the list of landmarks searched.
+    """
+    graph = snapshot.load(directory)
+    digest = snapshot.checksum(directory)
+    os.makedirs(os.path.join(directory, DIRECTORY), exist_ok=True)
+
+    missing = [
+        landmark for landmark in choose(graph, count)
+        if read(landmark_path(directory, graph.person_ids[landmark]),
+                digest, len(graph.person_ids)) is None
+    ]
+    tasks = [(directory, digest, landmark) for landmark in missing]
+    if workers == 1 or len(tasks) <= 1:
+        snapshot.init_worker(directory)
+        return [build_one(task) for task in tasks]
+    with multiprocessing.Pool(workers, initializer=snapshot.init_worker,
+                              initargs=(directory,)) as pool:
+        return list(pool.imap_unordered(build_one, tasks))
+
+
+class LandmarkIndex():
+    """
+    Distance bounds and ALT search over a Graph, backed by the landmark
+    files of its dataset.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+        # Distances only hold for the graph as it was when they were built
+        self.version = graph.version
+
+    def stale(self):
+        """
+        Returns True if the graph has changed since the index was loaded,
+        in which case its bounds can no longer be trusted.
+        """
+        return self.graph.version != self.version
+
+    @classmethod
+    def load(cls, directory, graph):
+        """
+        Loads every up-to-date landmark saved for `directory`.
+        """
+        digest = snapshot.checksum(directory)
+        landmarks, distances = [], []
+        folder = os.path.join(directory, DIRECTORY)
+        names = sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+        for name in names:
+            person_id, extension = os.path.splitext(name)
+            if extension != ".dist" or person_id not in graph.person_index:
+                continue
+            distance = read(os.path.join(folder, name), digest,
+                            len(graph.person_ids))
+            if distance is not None:
+                landmarks.append(graph.person_index[person_id])
+                distances.append(distance)
+        return cls(graph, landmarks, distances)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        people `source` and `target`; upper is None when no landmark
+        reaches both. Returns None if the index proves they are not
+        connected. A stale index only gives the trivial bounds.
+        """
+        if source == target:
+            return 0, 0
+        if self.stale():
+            return 1, None
+        lower, upper = 1, None
+        for distance in self.distances:
+            ds, dt = distance[source], distance[target]
+            if (ds == -1) != (dt == -1):
+                # One of them is in the landmark's component, one is not
+                return None
+            if ds == -1:
+                continue
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+    def degrees(self, source, target):
+        """
+        Returns the degrees of separation between `source` and `target`,
+        or None if they are not connected. Answered from the bounds
+        alone when they agree.
+        """
+        bounds = self.bounds(source, target)
+        if bounds is None:
+            return None
+        lower, upper = bounds
+        if lower == upper:
+            return lower
+        path = self.shortest_path(source, target)
+        return None if path is None else len(path)
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie index, person index) pairs
+        that connect `source` to `target`, using A* with the landmark
+        lower bound as heuristic. If no possible path, returns None.
+
+        If `stats` is a dict, the search counters are added to it
+        (see degrees.shortest_path).
+        """
+        if source == target:
+            return []
+        bounds = self.bounds(source, target)
+        if bounds is None:
+            return None
+        upper = bounds[1]
+
+        graph = self.graph
+        movies_of = graph.movies_of
+        stars_of = graph.stars_of
+        # Only the landmarks that bound this pair best are worth consulting.
+        # Once the index is stale, this is plain uniform-cost search.
+        target_distances = []
+        if not self.stale():
+            target_distances = heapq.nlargest(
+                ACTIVE, ((distance, distance[target])
+                         for distance in self.distances
+                         if distance[target] != -1),
+                key=lambda entry: abs(entry[0][source] - entry[1])
+            )
+        n = len(graph.person_ids)
+        estimate = array("h", [-1]) * n
+
+        def heuristic(p):
+            h = estimate[p]
+            if h != -1:
+                return h
+            h = 0
+            for distance, dt in target_distances:
+                dp = distance[p]
+                if dp != -1 and abs(dp - dt) > h:
+                    h = abs(dp - dt)
+            estimate[p] = h
+            return h
+
+        best = array("i", [-1]) * n
+        parent_person = array("i", [-1]) * n
+        parent_movie = array("i", [-1]) * n
+        # Lowest cost at which each movie's cast has been scanned
+        movie_cost = array("i", [-1]) * len(graph.movie_ids)
+        closed = bytearray(n)
+        best[source] = 0
+        parent_person[source] = source
+        # Among equal estimates, expand the deepest person first
+        frontier = [(heuristic(source), 0, source)]
+
+        expanded = generated = duplicates = 0
+        peak_frontier = 1
+        path = None
+        while frontier:
+            _, g, p = heapq.heappop(frontier)
+            g = -g
+            if closed[p]:
+                continue
+            if p == target:
+                path = graph.path((parent_person, parent_movie),
+                                  source, target)
+                break
+            closed[p] = 1
+            expanded += 1
+            for m in movies_of(p):
+                if movie_cost[m] != -1 and movie_cost[m] <= g:
+                    continue
+                movie_cost[m] = g
+                for q in stars_of(m):
+                    generated += 1
+                    if closed[q] or (best[q] != -1 and best[q] <= g + 1):
+                        duplicates += 1
+                        continue
+                    f = g + 1 + heuristic(q)
+                    # No path through q can beat a known upper bound
+                    if upper is not None and f > upper:
+                        continue
+                    best[q] = g + 1
+                    parent_person[q] = p
+                    parent_movie[q] = m
+                    heapq.heappush(frontier, (f, -g - 1, q))
+            peak_frontier = max(peak_frontier, len(frontier))
+
+        add_stats(stats, expanded=expanded, generated=generated,
+                  duplicates=duplicates, peak_frontier=peak_frontier)
+        return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the landmark index.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--count", type=int, default=16,
+                        help="number of landmarks")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    built = build(args.directory, args.count, args.workers)
+    print(f"Searched {len(built)} new or out-of-date landmarks.")
+
+
+if __name__ == "__main__":
+    main()
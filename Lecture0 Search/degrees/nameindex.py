@@ -0,0 +1,284 @@
+"""
+Prefix and typo-tolerant lookup of people by name.
+
+The index holds every person's lowercased name in one sorted table, so
+all names starting with a prefix form a contiguous range found by binary
+search, and an inverted index from character trigrams to the names that
+contain them, so names sharing most trigrams with a misspelled query
+can be found without scanning every name. Results are ranked by how many
+movies each person starred in.
+
+The index is saved next to the CSVs (names.index), tagged with their
+checksum like the graph snapshot, and rebuilt when they change. People
+added or renamed later through ingest.py are kept in a small overlay.
+
+Usage: python nameindex.py [directory] query
+"""
+
+import bisect
+import heapq
+import math
+import os
+import sys
+from array import array
+from collections import Counter
+
+import snapshot
+
+MAGIC = b"DEGNAME\0"
+VERSION = 1
+FILENAME = "names.index"
+
+# Smallest Dice similarity between trigram sets for a fuzzy match
+THRESHOLD = 0.4
+
+
+def trigrams(name):
+    """
+    Returns the set of character trigrams of a lowercased name,
+    padded so that its first and last letters count too.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a, b):
+    """
+    Returns the Dice coefficient of two trigram sets.
+    """
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+class NameIndex():
+    """
+    Sorted-name and trigram index over (person_id, name, movie count)
+    entries.
+    """
+
+    def __init__(self, keys, person_ids, film_counts, gram_counts,
+                 grams, gram_offsets, postings):
+        # Entry i is person person_ids[i], named keys[i], keys sorted,
+        # whose name has gram_counts[i] distinct trigrams
+        self.keys = keys
+        self.person_ids = person_ids
+        self.film_counts = film_counts
+        self.gram_counts = gram_counts
+        # postings[gram_offsets[g]:gram_offsets[g + 1]] are the entries
+        # whose names contain trigram grams[g]
+        self.grams = grams
+        self.gram_offsets = gram_offsets
+        self.postings = postings
+        self.gram_index = {gram: g for g, gram in enumerate(grams)}
+
+        # Changes made since the index was built or loaded
+        self.added = {}
+        self.hidden = set()
+        self.counts = {}
+
+    @classmethod
+    def build(cls, entries):
+        """
+        Builds an index from (person_id, name, movie count) entries.
+        """
+        entries = sorted((name.lower(), person_id, count)
+                         for person_id, name, count in entries)
+        keys = [key for key, _, _ in entries]
+        person_ids = [person_id for _, person_id, _ in entries]
+        film_counts = array("i", (count for _, _, count in entries))
+        gram_counts = array("i")
+
+        lists = {}
+        for i, key in enumerate(keys):
+            grams = trigrams(key)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                lists.setdefault(gram, array("i")).append(i)
+        grams = sorted(lists)
+        gram_offsets, postings = array("q", [0]), array("i")
+        for gram in grams:
+            postings.extend(lists[gram])
+            gram_offsets.append(len(postings))
+        return cls(keys, person_ids, film_counts, gram_counts,
+                   grams, gram_offsets, postings)
+
+    def save(self, path, digest):
+        """
+        Writes the index to `path`, tagged with `digest`.
+        """
+        sections = []
+        sections.extend(snapshot.pack_strings(self.keys))
+        sections.extend(snapshot.pack_strings(self.person_ids))
+        sections.append(self.film_counts)
+        sections.append(self.gram_counts)
+        sections.extend(snapshot.pack_strings(self.grams))
+        sections.append(self.gram_offsets)
+        sections.append(self.postings)
+        snapshot.write_sections(path, MAGIC, VERSION, digest, sections)
+
+    @classmethod
+    def read(cls, path):
+        """
+        Memory-maps an index written by save().
+        Returns (digest, index).
+        """
+        digest, sections = snapshot.read_sections(path, MAGIC, VERSION)
+        if len(sections) != 10:
+            raise snapshot.SnapshotError("unexpected number of sections")
+        keys = snapshot.StringTable(sections[0], sections[1])
+        person_ids = snapshot.StringTable(sections[2], sections[3])
+        grams = snapshot.StringTable(sections[6], sections[7])
+        return digest, cls(keys, person_ids, sections[4], sections[5],
+                           grams, sections[8], sections[9])
+
+    def film_count(self, person_id, i=None):
+        """
+        Returns the movie count used to rank `person_id`,
+        whose base entry (if any) is `i`.
+        """
+        if person_id in self.counts:
+            return self.counts[person_id]
+        if person_id in self.added:
+            return self.added[person_id][1]
+        return self.film_counts[i]
+
+    def add(self, person_id, name, count):
+        """
+        Adds a person, or records a new name for a known one.
+        """
+        self.hidden.add(person_id)
+        self.counts.pop(person_id, None)
+        self.added[person_id] = (name.lower(), count)
+
+    def set_film_count(self, person_id, count):
+        """
+        Records a new movie count for a person.
+        """
+        if person_id in self.added:
+            self.added[person_id] = (self.added[person_id][0], count)
+        else:
+            self.counts[person_id] = count
+
+    def prefix(self, text, limit=10):
+        """
+        Returns the person_ids of up to `limit` people whose names start
+        with `text`, ignoring case, most prolific first.
+        """
+        text = text.lower()
+        lo = bisect.bisect_left(self.keys, text)
+        hi = bisect.bisect_left(self.keys, text + chr(sys.maxunicode), lo)
+
+        candidates = [
+            (self.film_count(self.person_ids[i], i), self.person_ids[i])
+            for i in range(lo, hi)
+            if not self.hidden or self.person_ids[i] not in self.hidden
+        ]
+        candidates.extend(
+            (count, person_id)
+            for person_id, (key, count) in self.added.items()
+            if key.startswith(text)
+        )
+        return [person_id for _, person_id in heapq.nlargest(
+            limit, candidates, key=lambda entry: entry[0]
+        )]
+
+    def fuzzy(self, text, limit=10, threshold=THRESHOLD):
+        """
+        Returns the person_ids of up to `limit` people whose names are
+        within `threshold` trigram similarity of `text`, ignoring case,
+        best match first and most prolific first among equal matches.
+        """
+        query = trigrams(text.lower())
+
+        # A match shares at least `needed` of the query's trigrams, so it
+        # must appear in one of the len(lists) - needed + 1 shortest
+        # posting lists. Only those are scanned for candidates; the
+        # longest ones are binary searched for each candidate instead.
+        needed = max(1, math.ceil(threshold * len(query) / (2 - threshold)))
+        lists = sorted(
+            (self.postings[self.gram_offsets[g]:self.gram_offsets[g + 1]]
+             for g in (self.gram_index.get(gram) for gram in query)
+             if g is not None),
+            key=len
+        )
+        split = max(0, len(lists) - needed + 1)
+        shared = Counter()
+        for postings in lists[:split]:
+            shared.update(postings)
+
+        matches = []
+        for i, count in shared.items():
+            for postings in lists[split:]:
+                j = bisect.bisect_left(postings, i)
+                if j < len(postings) and postings[j] == i:
+                    count += 1
+            # Dice coefficient, from the number of shared trigrams
+            score = 2 * count / (len(query) + self.gram_counts[i])
+            if score < threshold:
+                continue
+            person_id = self.person_ids[i]
+            if self.hidden and person_id in self.hidden:
+                continue
+            matches.append((score, self.film_count(person_id, i), person_id))
+        for person_id, (key, count) in self.added.items():
+            score = similarity(query, trigrams(key))
+            if score >= threshold:
+                matches.append((score, count, person_id))
+        return [person_id for _, _, person_id in heapq.nlargest(
+            limit, matches, key=lambda match: match[:2]
+        )]
+
+
+def graph_entries(graph):
+    """
+    Yields (person_id, name, movie count) for every person in a Graph.
+    """
+    for p in range(len(graph.person_ids)):
+        yield graph.person_ids[p], graph.person_names[p], graph.movie_count(p)
+
+
+def load(directory, entries):
+    """
+    Returns the name index for the CSVs in `directory`, memory-mapped
+    from names.index. The file is (re)built first, from the
+    (person_id, name, movie count) iterable returned by `entries()`,
+    if it is missing, unreadable or out of date with the CSVs.
+    """
+    path = os.path.join(directory, FILENAME)
+    digest = snapshot.checksum(directory)
+    try:
+        saved, index = NameIndex.read(path)
+        if saved == digest:
+            return index
+    except (OSError, snapshot.SnapshotError):
+        pass
+
+    index = NameIndex.build(entries())
+    try:
+        index.save(path, digest)
+    except OSError:
+        return index
+    return NameIndex.read(path)[1]
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python nameindex.py [directory] query")
+    directory = sys.argv[1] if len(sys.argv) == 3 else "large"
+    query = sys.argv[-1]
+
+    graph = snapshot.load(directory)
+    index = load(directory, lambda: graph_entries(graph))
+    for title, person_ids in [
+        ("Prefix matches", index.prefix(query)),
+        ("Fuzzy matches", index.fuzzy(query)),
+    ]:
+        print(f"{title}:")
+        for person_id in person_ids:
+            p = graph.person_index[person_id]
+            print(f"  ID: {person_id}, Name: {graph.person_names[p]}, "
+                  f"Birth: {graph.person_births[p]}, "
+                  f"Movies: {graph.movie_count(p)}")
+
+
+if __name__ == "__main__":
+    main()
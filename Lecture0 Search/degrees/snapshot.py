@@ -0,0 +1,274 @@
+"""
+Binary snapshots of a degrees Graph.
+
+A snapshot holds the CSR arrays and string tables of a Graph in one
+file that can be memory-mapped, so later runs skip parsing the CSVs.
+The header records a format version and a checksum of the CSV files
+the snapshot was built from; a snapshot whose checksum no longer
+matches is rebuilt automatically.
+
+Usage: python snapshot.py [directory]
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+
+from graph import Graph
+
+MAGIC = b"DEGSNAP\0"
+VERSION = 1
+FILENAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# magic, version, byte order, checksum, number of sections
+HEADER = struct.Struct("<8sIB32sI")
+# typecode, offset, number of items
+SECTION = struct.Struct("<cQQ")
+
+INT_SECTIONS = ("person_offsets", "person_movies",
+                "movie_offsets", "movie_stars")
+STRING_SECTIONS = ("person_ids", "person_names", "person_births",
+                   "movie_ids", "movie_titles", "movie_years")
+
+# Graph mapped into a worker process by init_worker
+graph = None
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class StringTable(Sequence):
+    """
+    Read-only sequence of strings stored as UTF-8 in one buffer,
+    decoded on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        data = bytes(self.blob)
+        offsets = self.offsets
+        for i in range(len(offsets) - 1):
+            yield data[offsets[i]:offsets[i + 1]].decode("utf-8")
+
+
+def checksum(directory):
+    """
+    Returns the SHA-256 digest of the CSV files in `directory`. Each
+    file's name and length go in before its contents, so moving bytes
+    from one file to the next changes the digest.
+    """
+    digest = hashlib.sha256()
+    for name in SOURCES:
+        with open(os.path.join(directory, name), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            digest.update(f"{name}\0{size}\0".encode())
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.digest()
+
+
+def pack_strings(strings):
+    """
+    Returns (offsets, blob) arrays for a sequence of strings.
+    """
+    offsets = array("q", [0])
+    blob = bytearray()
+    for s in strings:
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, array("B", blob)
+
+
+@contextmanager
+def atomic_file(path):
+    """
+    Yields a binary file to write, which replaces `path` once the with
+    block ends without error. The data goes to a temporary file of its
+    own first, so readers never see half a file and processes building
+    the same file never write to the same one.
+    """
+    f = tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(os.path.abspath(path)),
+        prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False)
+    try:
+        with f:
+            yield f
+        os.replace(f.name, path)
+    except BaseException:
+        if os.path.exists(f.name):
+            os.remove(f.name)
+        raise
+
+
+def write_sections(path, magic, version, digest, sections):
+    """
+    Writes a list of arrays to `path` as one memory-mappable file,
+    with a header recording `magic`, `version` and `digest`.
+    """
+    # Lay sections out one after another, each aligned to 8 bytes
+    table = []
+    position = HEADER.size + SECTION.size * len(sections)
+    for section in sections:
+        position += -position % 8
+        typecode = getattr(section, "typecode", None) or section.format
+        table.append((typecode.encode(), position, len(section)))
+        position += section.itemsize * len(section)
+
+    with atomic_file(path) as f:
+        f.write(HEADER.pack(magic, version, sys.byteorder == "little",
+                            digest, len(sections)))
+        for entry in table:
+            f.write(SECTION.pack(*entry))
+        for (_, offset, _), section in zip(table, sections):
+            f.write(bytes(offset - f.tell()))
+            f.write(section)
+
+
+def read_sections(path, magic, version):
+    """
+    Memory-maps a file written by write_sections.
+    Returns (digest, list of memoryviews), or raises SnapshotError if
+    the file does not have the expected `magic` and `version`.
+    """
+    with open(path, "rb") as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotError("empty file")
+    if len(buffer) < HEADER.size:
+        raise SnapshotError("truncated file")
+
+    found, found_version, little, digest, count = HEADER.unpack_from(buffer)
+    if found != magic:
+        raise SnapshotError(f"not a {magic!r} file")
+    if found_version != version:
+        raise SnapshotError(f"version {found_version}, expected {version}")
+    if little != (sys.byteorder == "little"):
+        raise SnapshotError("file was written with another byte order")
+    if HEADER.size + count * SECTION.size > len(buffer):
+        raise SnapshotError("truncated file")
+
+    view = memoryview(buffer)
+    sections = []
+    for i in range(count):
+        typecode, offset, length = SECTION.unpack_from(
+            buffer, HEADER.size + i * SECTION.size
+        )
+        typecode = typecode.decode()
+        end = offset + array(typecode).itemsize * length
+        if end > len(buffer):
+            raise SnapshotError("truncated file")
+        sections.append(view[offset:end].cast(typecode))
+    return digest, sections
+
+
+def write(graph, path, digest):
+    """
+    Writes `graph` to a snapshot file at `path`, tagged with `digest`.
+    """
+    graph.compact()
+    sections = [getattr(graph, name) for name in INT_SECTIONS]
+    for name in STRING_SECTIONS:
+        sections.extend(pack_strings(getattr(graph, name)))
+    write_sections(path, MAGIC, VERSION, digest, sections)
+
+
+def read(path):
+    """
+    Memory-maps the snapshot at `path`.
+    Returns (digest, graph), or raises SnapshotError if the file is not
+    a snapshot this version can read.
+    """
+    digest, sections = read_sections(path, MAGIC, VERSION)
+    if len(sections) != len(INT_SECTIONS) + 2 * len(STRING_SECTIONS):
+        raise SnapshotError("unexpected number of sections")
+
+    arrays = dict(zip(INT_SECTIONS, sections))
+    strings = sections[len(INT_SECTIONS):]
+    for i, name in enumerate(STRING_SECTIONS):
+        arrays[name] = StringTable(strings[2 * i], strings[2 * i + 1])
+    return digest, Graph(**arrays)
+
+
+def load(directory):
+    """
+    Returns the Graph for the CSVs in `directory`, memory-mapped from
+    its snapshot. The snapshot is (re)built first if it is missing,
+    unreadable or out of date with the CSVs.
+    """
+    path = os.path.join(directory, FILENAME)
+    digest = checksum(directory)
+    try:
+        saved, graph = read(path)
+        if saved == digest:
+            return graph
+    except (OSError, SnapshotError):
+        pass
+
+    graph = Graph.from_csv(directory)
+    try:
+        write(graph, path, digest)
+    except OSError:
+        # Read-only data directory: fall back to the in-memory graph
+        return graph
+    return read(path)[1]
+
+
+def attach(directory):
+    """
+    Returns the Graph from the snapshot in `directory` without checking
+    it against the CSVs, for worker processes whose parent has already
+    called load(). Falls back to load() if the snapshot is unreadable.
+    """
+    try:
+        return read(os.path.join(directory, FILENAME))[1]
+    except (OSError, SnapshotError):
+        return load(directory)
+
+
+def init_worker(directory):
+    """
+    Pool initializer: maps the shared snapshot in `directory` into a
+    worker process, as `snapshot.graph`.
+    """
+    global graph
+    graph = attach(directory)
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python snapshot.py [directory]")
+    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+
+    graph = Graph.from_csv(directory)
+    path = os.path.join(directory, FILENAME)
+    write(graph, path, checksum(directory))
+    print(f"Wrote {len(graph.person_ids)} people and "
+          f"{len(graph.movie_ids)} movies to {path}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Benchmarks for the tictactoe search code.
+
+Usage: python benchmark.py search [--repeat N]
+       python benchmark.py functions [--repeat N]
+       python benchmark.py deepening [--boards MxNxK ...] [--depth N]
+                                     [--budget S]
+"""
+
+import argparse
+import time
+
+import bitboard
+import tictactoe as ttt
+from instrument import counting, patched
+
+
+def without_symmetry(module, search):
+    """
+    Returns `search` run with the module's transposition table keyed by
+    the exact position, ignoring symmetries.
+    """
+    if module is ttt:
+        def canonical(board):
+            identity = ttt.symmetries(len(board), len(board[0]))[0]
+            return ttt.board_key(board), identity
+    else:
+        def canonical(x, o):
+            return x << 9 | o, 0
+
+    def run():
+        with patched(module, {"canonical": canonical}):
+            return search()
+    return run
+
+
+def print_header():
+    print(f"{'search':<34}{'nodes':>10}{'seconds':>10}{'move':>10}")
+
+
+def print_row(name, nodes, elapsed, move):
+    print(f"{name:<34}{nodes:>10}{elapsed:>10.3f}{str(move):>10}")
+
+
+def bench_search(args):
+    board = ttt.initial_state()
+    x, o = bitboard.initial_state()
+    prone = ("Max_prone", "Min_prone")
+    searches = [
+        ("minimax", ttt, ("Max", "Min"), lambda: ttt.Max(board)),
+        ("alpha-beta", ttt, prone,
+         lambda: ttt.Max_prone(board, -1e9, 1e9)),
+        ("alpha-beta, symmetric root moves", ttt, prone,
+         lambda: ttt.Max_prone(board, -1e9, 1e9, None,
+                               ttt.distinct_actions(board))),
+        ("alpha-beta + table", ttt, prone, without_symmetry(
+            ttt, lambda: ttt.Max_prone(board, -1e9, 1e9, {}))),
+        ("+ symmetric table", ttt, prone,
+         lambda: ttt.Max_prone(board, -1e9, 1e9, {})),
+        ("+ symmetric root moves", ttt, prone,
+         lambda: ttt.Max_prone(board, -1e9, 1e9, {},
+                               ttt.distinct_actions(board))),
+        ("bitboard alpha-beta + table", bitboard, prone, without_symmetry(
+            bitboard, lambda: bitboard.Max_prone(x, o, -1e9, 1e9, {}))),
+        ("+ symmetric table", bitboard, prone,
+         lambda: bitboard.Max_prone(x, o, -1e9, 1e9, {})),
+        ("+ symmetric root moves", bitboard, prone,
+         lambda: bitboard.Max_prone(x, o, -1e9, 1e9, {}, [
+             (1 << (3 * i + j), (i, j))
+             for i, j in bitboard.distinct_actions((x, o))
+         ])),
+    ]
+
+    print_header()
+    for name, module, functions, search in searches:
+        with counting(module, functions) as counts:
+            search()
+        nodes = sum(counts.values())
+
+        # Time separately, without the counting wrappers
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            value, move = search()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print_row(name, nodes, elapsed, move)
+
+
+def positions():
+    """
+    Returns every position reachable from the initial state.
+    """
+    seen = {}
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = ttt.board_key(board)
+        if key in seen:
+            continue
+        seen[key] = board
+        if not ttt.terminal(board):
+            stack.extend(ttt.result(board, a) for a in ttt.actions(board))
+    return list(seen.values())
+
+
+def time_calls(function, arguments, repeat):
+    """
+    Returns the mean seconds per call of `function` over `arguments`.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for args in arguments:
+            function(*args)
+    return (time.perf_counter() - start) / (repeat * len(arguments))
+
+
+def bench_functions(args):
+    boards = positions()
+    bitboards = [bitboard.from_board(board) for board in boards]
+    moves = [(board, a) for board in boards for a in ttt.actions(board)]
+    bitmoves = [(bitboard.from_board(board), a) for board, a in moves]
+    open_boards = [board for board in boards if not ttt.terminal(board)]
+    print(f"{len(boards)} positions, {len(moves)} moves, "
+          f"{len(open_boards)} positions to play.")
+
+    cases = [(name, [(board,) for board in boards],
+              [(board,) for board in bitboards])
+             for name in ("player", "actions", "winner", "terminal",
+                          "utility")]
+    cases.append(("result", moves, bitmoves))
+
+    print(f"{'function':<12}{'list ns':>12}{'bitboard ns':>14}"
+          f"{'speedup':>10}")
+    for name, list_args, bit_args in cases:
+        before = time_calls(getattr(ttt, name), list_args, args.repeat)
+        after = time_calls(getattr(bitboard, name), bit_args, args.repeat)
+        print(f"{name:<12}{before * 1e9:>12.0f}{after * 1e9:>14.0f}"
+              f"{before / after:>9.1f}x")
+
+    # No book and a fresh table for every position, so each one is
+    # searched in full
+    def list_solve(board):
+        ttt.transpositions = {}
+        return ttt.minimax(board)
+
+    def bit_solve(board):
+        bitboard.transpositions = {}
+        return bitboard.minimax(board)
+
+    with patched(ttt, {"book": None}):
+        before = time_calls(list_solve, [(board,) for board in open_boards],
+                            1)
+        after = time_calls(bit_solve, [(bitboard.from_board(board),)
+                                       for board in open_boards], 1)
+    print(f"{'minimax':<12}{before * 1e9:>12.0f}{after * 1e9:>14.0f}"
+          f"{before / after:>9.1f}x")
+
+
+class UnorderedSearch(ttt.Search):
+    """
+    Search that tries moves in plain row-major order.
+    """
+    def order(self, board, ply):
+        return ttt.actions(board)
+
+
+def bench_deepening(args):
+    print(f"{'board':<8}{'search':<24}{'depth':>6}{'nodes':>10}"
+          f"{'seconds':>10}{'move':>10}")
+    for variant in args.boards:
+        m, n, k = ttt.parse_board(variant)
+        board = ttt.initial_state(m, n)
+        runs = [
+            (f"depth {args.depth}, unordered", UnorderedSearch(k=k),
+             args.depth),
+            (f"depth {args.depth}, ordered", ttt.Search(k=k), args.depth),
+            (f"{args.budget:g} s budget", ttt.Search(args.budget, k=k),
+             None),
+        ]
+        for name, search, depth in runs:
+            start = time.perf_counter()
+            move = ttt.iterative_deepening(board, search, depth)
+            elapsed = time.perf_counter() - start
+            print(f"{variant:<8}{name:<24}{search.depth:>6}"
+                  f"{search.nodes:>10}{elapsed:>10.3f}{str(move):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tictactoe.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = commands.add_parser("search",
+                                 help="nodes and time to solve the game")
+    search.add_argument("--repeat", type=int, default=1)
+    search.set_defaults(run=bench_search)
+
+    functions = commands.add_parser("functions",
+                                    help="list vs bitboard cost per call")
+    functions.add_argument("--repeat", type=int, default=10)
+    functions.set_defaults(run=bench_functions)
+
+    deepening = commands.add_parser("deepening",
+                                    help="iterative deepening on m,n,k "
+                                         "boards")
+    deepening.add_argument("--boards", nargs="+",
+                           default=["4x4x3", "4x4x4", "5x5x4"],
+                           help="board sizes and win lengths, as MxNxK")
+    deepening.add_argument("--depth", type=int, default=4,
+                           help="depth of the fixed-depth searches")
+    deepening.add_argument("--budget", type=float, default=1.0,
+                           help="seconds for the time-limited search")
+    deepening.set_defaults(run=bench_deepening)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
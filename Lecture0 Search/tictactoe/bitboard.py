@@ -0,0 +1,291 @@
+"""
+Tic Tac Toe engine on bitboards.
+
+A board is a pair (x, o) of 9-bit integers, with bit 3 * i + j set when
+that player has marked cell (i, j). Moves are bit-ors, and wins are
+tests against the eight line masks. The functions mirror the ones in
+tictactoe.py, with from_board and to_board to convert to and from its
+list-of-lists boards.
+"""
+
+import tictactoe
+from tictactoe import (X, O, EMPTY, EXACT, LOWER, UPPER, SYMMETRIES,
+                       INVERSES, NO_MOVE, transform)
+
+FULL = 0b111111111
+
+# The eight winning lines: rows, columns and diagonals
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+# CELLS[k] is the (i, j) of bit k
+CELLS = [(k // 3, k % 3) for k in range(9)]
+
+
+def has_line(bits):
+    """
+    Returns True if the marks in `bits` cover a winning line.
+    """
+    for line in LINES:
+        if bits & line == line:
+            return True
+    return False
+
+
+# Lookup tables over every 9-bit mask, filled once at import:
+# WON[bits] is has_line(bits), and MOVES[empty] lists the (bit, (i, j))
+# of each empty cell in row-major order, the order tictactoe.actions uses
+WON = bytes(has_line(bits) for bits in range(1 << 9))
+MOVES = [
+    [(1 << k, CELLS[k]) for k in range(9) if empty >> k & 1]
+    for empty in range(1 << 9)
+]
+
+# PERMUTED[symmetry][bits] is the mask `bits` under SYMMETRIES[symmetry]
+PERMUTED = [
+    [sum(1 << cells[k] for k in range(9) if bits >> k & 1)
+     for bits in range(1 << 9)]
+    for cells in SYMMETRIES
+]
+
+# TERNARY[bits] is the sum of 3 ** k over the bits k set in `bits`, so
+# that TERNARY[x] + 2 * TERNARY[o] is tictactoe.book_index of (x, o)
+TERNARY = [sum(3 ** k for k in range(9) if bits >> k & 1)
+           for bits in range(1 << 9)]
+
+# Transposition table shared by every call to minimax (see tictactoe.py)
+transpositions = {}
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return (0, 0)
+
+
+def from_board(board):
+    """
+    Returns the bitboard for a list-of-lists board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return (x, o)
+
+
+def to_board(board):
+    """
+    Returns the list-of-lists board for a bitboard.
+    """
+    x, o = board
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1
+             else EMPTY for j in range(3)] for i in range(3)]
+
+
+def player(board):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = board
+    return X if (x | o).bit_count() % 2 == 0 else O
+
+
+def actions(board):
+    """
+    Returns the list of all possible actions (i, j) available on the board.
+    """
+    x, o = board
+    return [cell for _, cell in MOVES[FULL & ~(x | o)]]
+
+
+def result(board, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    x, o = board
+    bit = 1 << (3 * action[0] + action[1])
+    if (x | o) & bit:
+        raise ValueError(f"cell {action} is not empty")
+    if (x | o).bit_count() % 2 == 0:
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def winner(board):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = board
+    if WON[x]:
+        return X
+    if WON[o]:
+        return O
+    return None
+
+
+def terminal(board):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    x, o = board
+    return bool(WON[x] or WON[o]) or x | o == FULL
+
+
+def canonical(x, o):
+    """
+    Returns (key, symmetry) for the position (x, o), like
+    tictactoe.canonical: key is the smallest x << 9 | o among the
+    position's 8 symmetric copies.
+    """
+    best = x << 9 | o
+    best_symmetry = 0
+    for symmetry in range(1, 8):
+        permuted = PERMUTED[symmetry]
+        key = permuted[x] << 9 | permuted[o]
+        if key < best:
+            best, best_symmetry = key, symmetry
+    return best, best_symmetry
+
+
+def distinct_actions(board):
+    """
+    Returns the actions on the board whose results differ up to symmetry.
+    """
+    seen = set()
+    action = []
+    for a in actions(board):
+        key = canonical(*result(board, a))[0]
+        if key not in seen:
+            seen.add(key)
+            action.append(a)
+    return action
+
+
+def utility(board):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    x, o = board
+    if WON[x]:
+        return 1
+    if WON[o]:
+        return -1
+    return 0
+
+
+def stored(act, symmetry):
+    """
+    Returns the action as kept in the table, in canonical orientation.
+    """
+    return None if act is None else transform(act, SYMMETRIES[symmetry])
+
+
+def Max_prone(x, o, alpha, beta, table=None, moves=None):
+    """
+    Alpha-beta search for X to move, on the two halves of a bitboard.
+    Returns (value, action) like tictactoe.Max_prone.
+    """
+    if WON[o]:
+        return -1, None
+    if x | o == FULL:
+        return 0, None
+    if table is not None:
+        key, symmetry = canonical(x, o)
+        entry = table.get(key)
+        if entry is not None:
+            value, bound, act = entry
+            if act is not None:
+                act = transform(act, INVERSES[symmetry])
+            if bound == EXACT:
+                return min(max(value, alpha), beta), act
+            if bound == LOWER and value >= beta:
+                return beta, act
+            if bound == UPPER and value <= alpha:
+                return alpha, act
+        alpha_orig = alpha
+    act = None
+    if moves is None:
+        moves = MOVES[FULL & ~(x | o)]
+    for bit, cell in moves:
+        V, A = Min_prone(x | bit, o, alpha, beta, table)
+        if V > alpha:
+            alpha = V
+            act = cell
+        if alpha >= beta:
+            if table is not None:
+                table[key] = (beta, LOWER, stored(act, symmetry))
+            return beta, act
+
+    if table is not None:
+        table[key] = (alpha, UPPER if alpha <= alpha_orig else EXACT,
+                      stored(act, symmetry))
+    return alpha, act
+
+
+def Min_prone(x, o, alpha, beta, table=None, moves=None):
+    """
+    Alpha-beta search for O to move, on the two halves of a bitboard.
+    Returns (value, action) like tictactoe.Min_prone.
+    """
+    if WON[x]:
+        return 1, None
+    if x | o == FULL:
+        return 0, None
+    if table is not None:
+        key, symmetry = canonical(x, o)
+        entry = table.get(key)
+        if entry is not None:
+            value, bound, act = entry
+            if act is not None:
+                act = transform(act, INVERSES[symmetry])
+            if bound == EXACT:
+                return min(max(value, alpha), beta), act
+            if bound == LOWER and value >= beta:
+                return beta, act
+            if bound == UPPER and value <= alpha:
+                return alpha, act
+        beta_orig = beta
+    act = None
+    if moves is None:
+        moves = MOVES[FULL & ~(x | o)]
+    for bit, cell in moves:
+        V, A = Max_prone(x, o | bit, alpha, beta, table)
+        if V < beta:
+            beta = V
+            act = cell
+        if alpha >= beta:
+            if table is not None:
+                table[key] = (alpha, UPPER, stored(act, symmetry))
+            return alpha, act
+
+    if table is not None:
+        table[key] = (beta, LOWER if beta >= beta_orig else EXACT,
+                      stored(act, symmetry))
+    return beta, act
+
+
+def minimax(board):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    if terminal(board):
+        return None
+    x, o = board
+    if tictactoe.book is not None:
+        move = tictactoe.book[TERNARY[x] + 2 * TERNARY[o]]
+        if move != NO_MOVE:
+            return CELLS[move]
+    # Only one move of each group of symmetric moves needs searching
+    moves = [(1 << (3 * i + j), (i, j)) for i, j in distinct_actions(board)]
+    if player(board) == X:
+        return Max_prone(x, o, -1e9, 1e9, transpositions, moves)[-1]
+    else:
+        return Min_prone(x, o, -1e9, 1e9, transpositions, moves)[-1]
@@ -0,0 +1,68 @@
+"""
+Builds the tictactoe opening book.
+
+Solves every position reachable from the initial state once, and writes
+the best move for each to a 19683-byte file (one byte per position, see
+tictactoe.book_index) that tictactoe.minimax and bitboard.minimax then
+look up instead of searching.
+
+Usage: python book.py [path]
+"""
+
+import sys
+import time
+
+import bitboard
+import tictactoe as ttt
+
+
+def positions():
+    """
+    Returns every position reachable from the initial state,
+    as bitboards.
+    """
+    seen = set()
+    stack = [bitboard.initial_state()]
+    while stack:
+        board = stack.pop()
+        if board in seen:
+            continue
+        seen.add(board)
+        if not bitboard.terminal(board):
+            stack.extend(bitboard.result(board, a)
+                         for a in bitboard.actions(board))
+    return seen
+
+
+def build():
+    """
+    Returns the opening book as bytes.
+    """
+    # Search every position, rather than look up an older book
+    ttt.book = None
+    book = bytearray([ttt.NO_MOVE]) * 3 ** 9
+    for board in positions():
+        move = bitboard.minimax(board)
+        if move is not None:
+            x, o = board
+            index = bitboard.TERNARY[x] + 2 * bitboard.TERNARY[o]
+            book[index] = 3 * move[0] + move[1]
+    return bytes(book)
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [path]")
+    path = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK_FILE
+
+    start = time.perf_counter()
+    book = build()
+    with open(path, "wb") as f:
+        f.write(book)
+    moves = sum(1 for move in book if move != ttt.NO_MOVE)
+    print(f"Wrote {moves} moves to {path} "
+          f"in {time.perf_counter() - start:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    main()
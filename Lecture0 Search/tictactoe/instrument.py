@@ -0,0 +1,146 @@
+"""
+Search instrumentation for tictactoe.
+
+instrumented() temporarily wraps the search functions of tictactoe.py
+(Max, Min, Max_prone, Min_prone, Max_limited, Min_limited and the
+transposition table probe) so that every search run meanwhile, including
+minimax, is counted:
+
+    nodes       calls to the search functions
+    cutoffs     nodes that stopped early on an alpha-beta cutoff
+    table_hits  nodes answered from the transposition table
+    max_depth   deepest ply reached below the root
+
+The search code itself is untouched, so there is no cost when it is not
+instrumented. patched() and counting() are the general tools it is built
+on, for replacing or counting any module functions for a while.
+"""
+
+from contextlib import contextmanager
+
+import tictactoe as ttt
+
+
+@contextmanager
+def patched(module, replacements):
+    """
+    Temporarily replaces attributes of `module`, given by name.
+    """
+    originals = {name: getattr(module, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(module, name, value)
+
+
+@contextmanager
+def counting(module, names):
+    """
+    Temporarily wraps the functions of `module` in `names` so that every
+    call is counted, including the recursive calls between them.
+    Yields the dict of counts by name.
+    """
+    counts = dict.fromkeys(names, 0)
+
+    def wrap(name, function):
+        def counted(*args, **kwargs):
+            counts[name] += 1
+            return function(*args, **kwargs)
+        return counted
+
+    with patched(module, {name: wrap(name, getattr(module, name))
+                          for name in names}):
+        yield counts
+
+
+class Counters():
+    """
+    Search counters, added to by every instrumented search.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.cutoffs = 0
+        self.table_hits = 0
+        self.max_depth = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def __str__(self):
+        return ", ".join(f"{name} {value}"
+                         for name, value in self.as_dict().items())
+
+
+@contextmanager
+def instrumented(counters=None):
+    """
+    Counts the searches run in the with block into `counters` (a new
+    Counters by default), which it yields.
+    """
+    if counters is None:
+        counters = Counters()
+    # One entry per search function call in progress: whether that node
+    # was answered from the table
+    stack = []
+
+    def wrap_plain(function):
+        def counted(board):
+            counters.nodes += 1
+            counters.max_depth = max(counters.max_depth, len(stack))
+            stack.append(False)
+            try:
+                return function(board)
+            finally:
+                stack.pop()
+        return counted
+
+    def wrap_pruned(function, maximizing, limited):
+        def counted(board, *args, **kwargs):
+            counters.nodes += 1
+            counters.max_depth = max(counters.max_depth, len(stack))
+            stack.append(False)
+            try:
+                value, act = function(board, *args, **kwargs)
+                hit = stack[-1]
+            finally:
+                stack.pop()
+            if limited:
+                depth, alpha, beta, search = args[:4]
+                leaf = depth == 0
+                k = search.k
+            else:
+                alpha, beta = args[:2]
+                leaf = False
+                k = None
+            # A cutoff returns the bound it failed high (or low) against
+            if not hit and not leaf and not ttt.terminal(board, k):
+                if value >= beta if maximizing else value <= alpha:
+                    counters.cutoffs += 1
+            return value, act
+        return counted
+
+    probe = ttt.probe
+
+    def counted_probe(*args, **kwargs):
+        entry = probe(*args, **kwargs)
+        if entry is not None:
+            counters.table_hits += 1
+            if stack:
+                stack[-1] = True
+        return entry
+
+    replacements = {
+        "Max": wrap_plain(ttt.Max),
+        "Min": wrap_plain(ttt.Min),
+        "Max_prone": wrap_pruned(ttt.Max_prone, True, False),
+        "Min_prone": wrap_pruned(ttt.Min_prone, False, False),
+        "Max_limited": wrap_pruned(ttt.Max_limited, True, True),
+        "Min_limited": wrap_pruned(ttt.Min_limited, False, True),
+        "probe": counted_probe,
+    }
+    with patched(ttt, replacements):
+        yield counters
@@ -0,0 +1,107 @@
+"""
+Load test for server.py.
+
+Opens a number of client connections to a running move server, each
+sending batches of random positions (random games cut off at a random
+move) one request after another, and reports requests and boards per
+second and percentiles of the time each request takes.
+
+Usage: python loadtest.py [--host H] [--port N] [--clients N]
+                          [--requests N] [--batch N] [--board MxNxK]
+                          [--seed N]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import server
+import tictactoe as ttt
+from selfplay import percentile
+
+
+def random_board(m, n, k, rng):
+    """
+    Returns the board after a random number of random moves, with k in
+    a row to win.
+    """
+    board = ttt.initial_state(m, n)
+    for _ in range(rng.randrange(m * n)):
+        if ttt.terminal(board, k):
+            break
+        board = ttt.result(board, rng.choice(ttt.actions(board)))
+    return board
+
+
+async def client(host, port, requests, k, batches, latencies):
+    """
+    Sends each of `requests` batches, with k in a row to win, in turn on
+    one connection, and appends how long each took to `latencies`.
+    """
+    reader, writer = await asyncio.open_connection(host, port,
+                                                   limit=server.LINE_LIMIT)
+    try:
+        for number in range(requests):
+            request = {"id": number, "k": k,
+                       "boards": batches[number % len(batches)]}
+            start = time.perf_counter()
+            writer.write(json.dumps(request).encode() + b"\n")
+            await writer.drain()
+            reply = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            if "error" in reply:
+                raise RuntimeError(f"server error: {reply['error']}")
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run(args, k, batches):
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client(args.host, args.port, args.requests, k, batches, latencies)
+        for _ in range(args.clients)
+    ))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the tictactoe "
+                                                 "move server.")
+    parser.add_argument("--host", default=server.HOST)
+    parser.add_argument("--port", type=int, default=server.PORT)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100,
+                        help="requests sent by each client")
+    parser.add_argument("--batch", type=int, default=16,
+                        help="boards per request")
+    parser.add_argument("--board", default="3x3x3",
+                        help="board size and win length, as MxNxK")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    m, n, k = ttt.parse_board(args.board)
+    rng = random.Random(args.seed)
+    # Every client cycles through the same batches, so that later
+    # requests test the shared cache
+    batches = [[random_board(m, n, k, rng) for _ in range(args.batch)]
+               for _ in range(args.requests)]
+
+    elapsed, latencies = asyncio.run(run(args, k, batches))
+    requests = len(latencies)
+    print(f"{args.clients} clients sent {requests} requests of "
+          f"{args.batch} {args.board} boards in {elapsed:.2f} seconds: "
+          f"{requests / elapsed:.1f} requests/sec, "
+          f"{requests * args.batch / elapsed:.1f} boards/sec.")
+    latencies.sort()
+    print("Latency ms: " + ", ".join(
+        f"p{p} {1000 * percentile(latencies, p):.3f}"
+        for p in (50, 90, 99)
+    ) + f", max {1000 * latencies[-1]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
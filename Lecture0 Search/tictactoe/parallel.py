@@ -0,0 +1,176 @@
+"""
+Parallel depth-limited search for tictactoe.
+
+Splits the root moves across a process pool, Young Brothers Wait style:
+the first root move (the eldest brother) is searched alone, to get a
+good bound, and only then are its younger brothers searched in
+parallel. The best value found so far, and the index of the root move
+that has it, are shared between the workers through a two-slot
+multiprocessing.Array, read at the start of each root move and updated
+whenever a worker beats it.
+
+The serial search keeps the first root move with the best value, so
+moves are ranked by (value, -index): a tie goes to the earlier move. A
+root move after the holder of the best value only needs to beat it, so
+it is searched with the best value as its bound (alpha for X, beta for
+O). One before the holder also wins a tie, so it is searched with the
+eldest brother's value as its bound instead: the best value only moved
+off the eldest's because some move beat it, so anything that ties the
+best comes back exact. The parallel search thus picks the same move as
+the serial Max_limited/Min_limited at the same depth.
+
+Usage: python parallel.py [--board MxNxK] [--depth N] [--workers N ...]
+"""
+
+import argparse
+import multiprocessing
+import time
+
+import tictactoe as ttt
+
+
+def init_worker(best):
+    """
+    Keeps the shared [best value, root move index] in a worker process.
+    """
+    global shared
+    shared = best
+
+
+def search_move(task):
+    """
+    Searches one root move to `depth` plies, in a worker, with the root
+    player's bound taken from the shared best value.
+    Returns (index, value).
+    """
+    board, k, depth, index, action, eldest, killers, history = task
+    child = ttt.result(board, action)
+    search = ttt.Search(k=k)
+    search.killers, search.history = killers, history
+    maximizing = ttt.player(board) == ttt.X
+    with shared.get_lock():
+        best, holder = shared[:]
+    # Ties only matter for moves the serial search would try first
+    bound = eldest if index < holder else best
+    if maximizing:
+        value, _ = ttt.Min_limited(child, depth - 1, bound, 1e9, search, 1)
+    else:
+        value, _ = ttt.Max_limited(child, depth - 1, -1e9, bound, search, 1)
+
+    sign = 1 if maximizing else -1
+    with shared.get_lock():
+        best, holder = shared[:]
+        if (sign * value, -index) > (sign * best, -holder):
+            shared[:] = [value, index]
+    return index, value
+
+
+def serial_best_move(board, depth, k=None):
+    """
+    Returns (action, value) from the serial search to `depth` plies,
+    with k (tictactoe.K by default) in a row to win.
+    """
+    if ttt.player(board) == ttt.X:
+        limited = ttt.Max_limited
+    else:
+        limited = ttt.Min_limited
+    value, act = limited(board, depth, -1e9, 1e9, ttt.Search(k=k))
+    return act, value
+
+
+class ParallelSearch():
+    """
+    Pool of worker processes for parallel root-split searches.
+    """
+
+    def __init__(self, workers=None):
+        self.best = multiprocessing.Array("d", 2)
+        self.pool = multiprocessing.Pool(workers, initializer=init_worker,
+                                         initargs=(self.best,))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def best_move(self, board, depth, k=None):
+        """
+        Returns (action, value) for the current player, searching `depth`
+        plies with k (tictactoe.K by default) in a row to win; the same
+        as serial_best_move(board, depth, k).
+        """
+        if k is None:
+            k = ttt.K
+        if ttt.terminal(board, k):
+            return None, ttt.utility(board, k)
+        maximizing = ttt.player(board) == ttt.X
+        # The serial search tries root moves in this order
+        moves = ttt.Search(k=k).order(board, 0)
+        if depth == 0 or len(moves) == 1:
+            return serial_best_move(board, depth, k)
+
+        # Eldest brother first, alone, with the full window. Its killer
+        # moves and history scores then order the younger brothers' moves.
+        child = ttt.result(board, moves[0])
+        search = ttt.Search(k=k)
+        if maximizing:
+            eldest, _ = ttt.Min_limited(child, depth - 1, -1e9, 1e9,
+                                        search, 1)
+        else:
+            eldest, _ = ttt.Max_limited(child, depth - 1, -1e9, 1e9,
+                                        search, 1)
+        self.best[:] = [eldest, 0]
+
+        values = [eldest] + [None] * (len(moves) - 1)
+        tasks = [(board, k, depth, index, action, eldest,
+                  search.killers, search.history)
+                 for index, action in enumerate(moves) if index > 0]
+        for index, value in self.pool.imap_unordered(search_move, tasks):
+            values[index] = value
+
+        # The first move with the best value, as the serial search picks
+        best = max if maximizing else min
+        value = best(values)
+        return moves[values.index(value)], value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parallel search "
+                                                 "scaling.")
+    parser.add_argument("--board", default="4x4x4",
+                        help="board size and win length, as MxNxK")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=[1, 2, 4])
+    args = parser.parse_args()
+
+    m, n, k = ttt.parse_board(args.board)
+    board = ttt.initial_state(m, n)
+    print(f"{multiprocessing.cpu_count()} CPUs; {args.board} board, "
+          f"depth {args.depth}.")
+
+    start = time.perf_counter()
+    serial_move, serial_value = serial_best_move(board, args.depth, k)
+    serial = time.perf_counter() - start
+    print(f"{'workers':<10}{'seconds':>10}{'speedup':>10}{'move':>10}"
+          f"{'same':>6}")
+    print(f"{'serial':<10}{serial:>10.3f}{1:>9.2f}x{str(serial_move):>10}")
+
+    for workers in args.workers:
+        with ParallelSearch(workers) as search:
+            # Time the search alone, not the pool start-up
+            start = time.perf_counter()
+            move, value = search.best_move(board, args.depth, k)
+            elapsed = time.perf_counter() - start
+        same = move == serial_move and value == serial_value
+        print(f"{workers:<10}{elapsed:>10.3f}{serial / elapsed:>9.2f}x"
+              f"{str(move):>10}{'yes' if same else 'NO':>6}")
+
+
+if __name__ == "__main__":
+    main()
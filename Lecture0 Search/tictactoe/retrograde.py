@@ -0,0 +1,260 @@
+"""
+Retrograde solver for tictactoe.
+
+Instead of searching forward from each position, as minimax does, solves
+a whole m x n board with k in a row at once. It lists every reachable
+position, ply by ply, marking the terminal ones with their winner, then
+works backwards from the last ply to the first, giving each position the
+best score among its moves. The result is a table with the value of
+every position and how many plies the game lasts from there, with both
+sides playing perfectly.
+
+A score is from X's point of view: LIMIT - d for a win for X d plies
+from the end, -(LIMIT - d) for a win for O, and 0 for a draw (which only
+ends on a full board, so d is the number of empty cells). Maximizing
+the score for X, and minimizing it for O, so picks the fastest win and
+the slowest loss, where minimax treats every win alike.
+
+Positions are bitboards x << cells | o, with bit n * i + j for cell
+(i, j), and only one of each group of symmetric positions is kept, so
+larger boards such as 4 x 4 still fit.
+
+Usage: python retrograde.py [--board MxNxK]
+"""
+
+import argparse
+import time
+
+import tictactoe as ttt
+
+# Scores of the first move of a game are at most this far from 0
+LIMIT = 1000
+
+
+class Solution():
+    """
+    Value table of every reachable position of an m x n board with k in
+    a row to win.
+    """
+
+    def __init__(self, m=3, n=3, k=3):
+        self.m, self.n, self.k = m, n, k
+        self.cells = cells = m * n
+        self.full = (1 << cells) - 1
+        # lines_through[c]: masks of the winning lines through cell c
+        masks = [sum(1 << (n * i + j) for i, j in line)
+                 for line in ttt.lines(m, n, k)]
+        self.lines_through = [[mask for mask in masks if mask >> c & 1]
+                              for c in range(cells)]
+        # Each symmetry but the identity, as tables that move the marks
+        # of one player: one table over whole halves of the position on
+        # boards of up to 16 cells, or one per 8 cells on larger ones
+        self.width = cells if cells <= 16 else 8
+        self.permutations = []
+        for symmetry, _, _ in ttt.symmetries(m, n)[1:]:
+            chunks = []
+            for low in range(0, cells, self.width):
+                chunks.append([
+                    sum(1 << symmetry[low + b] for b in range(self.width)
+                        if chunk >> b & 1)
+                    for chunk in range(1 << min(self.width, cells - low))
+                ])
+            self.permutations.append(chunks)
+        # Canonical position -> score
+        self.table = {}
+        # Number of positions not yet over, by ply
+        self.positions = []
+        self.solve()
+
+    def permute(self, chunks, bits):
+        """
+        Returns the marks `bits` moved by the symmetry `chunks`.
+        """
+        moved = 0
+        for chunk in chunks:
+            moved |= chunk[bits & (1 << self.width) - 1]
+            bits >>= self.width
+        return moved
+
+    def canonical(self, x, o):
+        """
+        Returns the smallest key x << cells | o among the symmetric copies
+        of the position.
+        """
+        cells = self.cells
+        if cells <= 16:
+            return min([x << cells | o] + [
+                table[x] << cells | table[o]
+                for table, in self.permutations
+            ])
+        return min([x << cells | o] + [
+            self.permute(chunks, x) << cells | self.permute(chunks, o)
+            for chunks in self.permutations
+        ])
+
+    def won(self, bits):
+        """
+        Returns True if the marks in bits cover a winning line.
+        """
+        return any(bits & line == line
+                   for lines in self.lines_through for line in lines)
+
+    def solve(self):
+        """
+        Fills the table: forward, ply by ply, to find every position and
+        score the ones that end the game, then backward to score the
+        rest.
+        """
+        cells, full = self.cells, self.full
+        lines_through = self.lines_through
+        table = self.table
+        canonical = self.canonical
+        # Each position not yet over, and the canonical keys of its
+        # children, by ply
+        layers = []
+        layer = {0}
+        while layer:
+            ply = len(layers)
+            last = ply + 1 == cells
+            win = LIMIT if ply % 2 == 0 else -LIMIT
+            moves = {}
+            following = set()
+            for key in layer:
+                x, o = key >> cells, key & full
+                empty = full & ~(x | o)
+                children = []
+                while empty:
+                    bit = empty & -empty
+                    empty ^= bit
+                    if ply % 2 == 0:
+                        mine = x | bit
+                        child = canonical(mine, o)
+                    else:
+                        mine = o | bit
+                        child = canonical(x, mine)
+                    children.append(child)
+                    if any(mine & line == line
+                           for line in lines_through[bit.bit_length() - 1]):
+                        table[child] = win
+                    elif last:
+                        table[child] = 0
+                    else:
+                        following.add(child)
+                moves[key] = children
+            layers.append(moves)
+            self.positions.append(len(moves))
+            layer = following
+
+        while layers:
+            best = max if len(layers) % 2 == 1 else min
+            for key, children in layers.pop().items():
+                # A win or loss is one ply further away from the parent
+                score = best([table[child] for child in children])
+                table[key] = score - (score > 0) + (score < 0)
+
+    def key(self, board):
+        """
+        Returns the position key of a list-of-lists board.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, cell in enumerate(row):
+                if cell == ttt.X:
+                    x |= 1 << (self.n * i + j)
+                elif cell == ttt.O:
+                    o |= 1 << (self.n * i + j)
+        return x << self.cells | o
+
+    def score(self, board):
+        """
+        Returns the score of the board (see the module docstring).
+        """
+        key = self.key(board)
+        return self.table[self.canonical(key >> self.cells, key & self.full)]
+
+    def value(self, board):
+        """
+        Returns (utility, plies) for the board with perfect play: 1 if X
+        wins, -1 if O wins, 0 for a draw, and how many plies that takes.
+        """
+        score = self.score(board)
+        if score == 0:
+            return 0, sum(row.count(ttt.EMPTY) for row in board)
+        return (1 if score > 0 else -1), LIMIT - abs(score)
+
+    def best_move(self, board):
+        """
+        Returns the action (i, j) that wins fastest, or loses slowest, for
+        the current player, or None if the game is over. Of equal moves,
+        the first in tictactoe.actions order is taken.
+        """
+        key = self.key(board)
+        x, o = key >> self.cells, key & self.full
+        if x | o == self.full or self.won(x) or self.won(o):
+            return None
+        maximizing = (x | o).bit_count() % 2 == 0
+        best_score = best_cell = None
+        for c in range(self.cells):
+            bit = 1 << c
+            if (x | o) & bit:
+                continue
+            if maximizing:
+                score = self.table[self.canonical(x | bit, o)]
+            else:
+                score = self.table[self.canonical(x, o | bit)]
+            if (best_score is None or (score > best_score if maximizing
+                                       else score < best_score)):
+                best_score, best_cell = score, c
+        return divmod(best_cell, self.n)
+
+
+# Solutions already built, by (m, n, k)
+solutions = {}
+
+
+def solution(m=3, n=3, k=None):
+    """
+    Returns the Solution for an m x n board with k (tictactoe.K by
+    default) in a row to win, solving it the first time.
+    """
+    if k is None:
+        k = ttt.K
+    if (m, n, k) not in solutions:
+        solutions[m, n, k] = Solution(m, n, k)
+    return solutions[m, n, k]
+
+
+def minimax(board, k=None):
+    """
+    Returns the action that wins fastest, or loses slowest, for the
+    current player on the board, with k (tictactoe.K by default) in a
+    row to win.
+    """
+    if ttt.terminal(board, k):
+        return None
+    return solution(len(board), len(board[0]), k).best_move(board)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve tictactoe by "
+                                                 "retrograde analysis.")
+    parser.add_argument("--board", default="3x3x3",
+                        help="board size and win length, as MxNxK")
+    args = parser.parse_args()
+    m, n, k = ttt.parse_board(args.board)
+
+    start = time.perf_counter()
+    solved = Solution(m, n, k)
+    elapsed = time.perf_counter() - start
+    utility, plies = solved.value(ttt.initial_state(m, n))
+    outcome = {1: "X wins", -1: "O wins", 0: "draw"}[utility]
+    print(f"Solved {args.board} in {elapsed:.2f} seconds: "
+          f"{len(solved.table)} positions up to symmetry, "
+          f"{outcome} in {plies} plies.")
+    print(f"{'ply':>4}{'positions':>12}")
+    for ply, positions in enumerate(solved.positions):
+        print(f"{ply:>4}{positions:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,24 @@
 import pygame
 import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
+import bitboard
 import tictactoe as ttt
 
+# Board size and win length, as MxNxK on the command line
+if len(sys.argv) > 2:
+    sys.exit("Usage: python runner.py [MxNxK]")
+m, n, k = ttt.parse_board(sys.argv[1] if len(sys.argv) == 2 else "3x3x3")
+
 pygame.init()
 size = width, height = 600, 400
 
+# Frames drawn per second, and the least time the computer seems to think
+FPS = 30
+THINK_DELAY = 0.5
+
 # Colors
 black = (0, 0, 0)
 white = (255, 255, 255)
@@ -15,16 +27,52 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles as large as fit between the title and the button, up to 80 pixels
+tile_size = min(80, 240 // m, (width - 40) // n)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(m, n)
+
+
+def choose_move(board, cancel):
+    """
+    Returns the computer's move, stopping early if `cancel` is set.
+    """
+    if m == 3 and n == 3 and k == 3:
+        return bitboard.minimax(bitboard.from_board(board))
+    return ttt.minimax(board, cancel, k)
+
+
+# The computer's move is searched in a background thread, so the window
+# keeps drawing while it thinks
+executor = ThreadPoolExecutor(max_workers=1)
+future = None
+cancel = None
+thinking_since = None
+
+
+def stop_thinking():
+    """
+    Cancels the computer's pending move, if any.
+    """
+    global future, cancel
+    if future is not None:
+        cancel.set()
+        future.cancel()
+    future = None
+    cancel = None
+
+
+clock = pygame.time.Clock()
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            stop_thinking()
+            executor.shutdown(wait=False, cancel_futures=True)
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +115,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (n / 2 * tile_size),
+                       height / 2 - (m / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(m):
             row = []
-            for j in range(3):
+            for j in range(n):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -89,12 +136,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
+        game_over = ttt.terminal(board, k)
         player = ttt.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = ttt.winner(board, k)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -102,7 +149,8 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (int(time.time() * 3) % 4)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
@@ -110,37 +158,41 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
+            if future is None:
+                cancel = threading.Event()
+                future = executor.submit(choose_move, board, cancel)
+                thinking_since = time.time()
+            elif (future.done()
+                    and time.time() - thinking_since >= THINK_DELAY):
+                move = future.result()
+                future = None
                 board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(m):
+                for j in range(n):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+        # The game can be reset at any time, even while the computer thinks
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        label = "Play Again" if game_over else "Reset"
+        again = mediumFont.render(label, True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+                stop_thinking()
+                user = None
+                board = ttt.initial_state(m, n)
 
     pygame.display.flip()
+    clock.tick(FPS)
@@ -0,0 +1,106 @@
+"""
+Headless self-play benchmark for tictactoe.
+
+Plays N full games of minimax against itself, or against a player who
+moves at random, and reports the results, the search counters from
+instrument.py, moves per second and percentiles of the time minimax
+takes per move. As in a real session, the transposition table is kept
+from move to move and game to game.
+
+Usage: python selfplay.py [--games N] [--opponent ai|random]
+                          [--board MxNxK] [--budget S] [--book]
+                          [--no-counters] [--seed N]
+"""
+
+import argparse
+import random
+import time
+from contextlib import nullcontext
+
+import instrument
+import tictactoe as ttt
+
+
+def percentile(values, p):
+    """
+    Returns the p-th percentile of a sorted list, by nearest rank.
+    """
+    rank = max(1, round(p / 100 * len(values)))
+    return values[rank - 1]
+
+
+def play(m, n, k, opponent, rng, latencies, budget=None, use_book=True):
+    """
+    Plays one game on an m x n board with k in a row to win, and
+    returns its winner (or None for a tie). Each move minimax makes gets
+    `budget` seconds, and uses the opening book if `use_book`. The AI
+    plays both sides, or X against a random O player if `opponent` is
+    "random". Appends the seconds minimax took for each move to
+    `latencies`.
+    """
+    board = ttt.initial_state(m, n)
+    while not ttt.terminal(board, k):
+        if opponent == "random" and ttt.player(board) == ttt.O:
+            move = rng.choice(ttt.actions(board))
+        else:
+            start = time.perf_counter()
+            move = ttt.minimax(board, k=k, budget=budget,
+                               use_book=use_book)
+            latencies.append(time.perf_counter() - start)
+        board = ttt.result(board, move)
+    return ttt.winner(board, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tictactoe "
+                                                 "self-play.")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--opponent", choices=["ai", "random"],
+                        default="random")
+    parser.add_argument("--board", default="3x3x3",
+                        help="board size and win length, as MxNxK")
+    parser.add_argument("--budget", type=float, default=ttt.TIME_BUDGET,
+                        help="seconds per move on boards too large to "
+                             "solve")
+    parser.add_argument("--book", action="store_true",
+                        help="let minimax use the opening book, instead of "
+                             "searching every move")
+    parser.add_argument("--no-counters", action="store_true",
+                        help="time the search without the counting "
+                             "wrappers")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    m, n, k = ttt.parse_board(args.board)
+    rng = random.Random(args.seed)
+
+    results = {ttt.X: 0, ttt.O: 0, None: 0}
+    latencies = []
+    start = time.perf_counter()
+    if args.no_counters:
+        counting = nullcontext(None)
+    else:
+        counting = instrument.instrumented()
+    with counting as counters:
+        for _ in range(args.games):
+            results[play(m, n, k, args.opponent, rng, latencies,
+                         args.budget, args.book)] += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.games} games on {args.board} against {args.opponent} in "
+          f"{elapsed:.2f} seconds: X won {results[ttt.X]}, "
+          f"O won {results[ttt.O]}, {results[None]} ties.")
+    if counters is not None:
+        print(f"Search: {counters}.")
+    if latencies:
+        latencies.sort()
+        print(f"{len(latencies)} AI moves, "
+              f"{len(latencies) / sum(latencies):.1f} moves/sec.")
+        print("Latency ms: " + ", ".join(
+            f"p{p} {1000 * percentile(latencies, p):.3f}"
+            for p in (50, 90, 99)
+        ) + f", max {1000 * latencies[-1]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Headless tictactoe move server.
+
+Serves tictactoe.minimax over TCP with asyncio, one JSON object per line.
+A request holds a batch of boards, written as in tictactoe.py (rows of
+"X", "O" and null), and optionally k, the marks in a row needed to win:
+
+    {"id": 1, "k": 3, "boards": [[["X", null, null], ...], ...]}
+
+The reply gives the best move [i, j] for each board, or null once its
+game is over, in the same order:
+
+    {"id": 1, "moves": [[1, 1], ...]}
+
+and a bad request, or one whose search fails in a worker, gets
+{"id": 1, "error": "..."} instead. Moves come from
+a position cache shared by every client, keyed by canonical position so
+that symmetric boards share an entry. Positions not in the cache are
+searched in a pool of worker processes, so the event loop keeps serving
+other clients meanwhile, and requests for a position already being
+searched wait for that search instead of starting another.
+
+Usage: python server.py [--host H] [--port N] [--workers N] [--budget S]
+                        [--cache-size N]
+"""
+
+import argparse
+import asyncio
+import json
+import signal
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import tictactoe as ttt
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Most positions kept in the cache, the least recently used going first
+CACHE_SIZE = 100000
+
+# Longest request line read, in bytes
+LINE_LIMIT = 1 << 20
+
+
+def init_worker(budget):
+    """
+    Sets the time budget for searches in a worker process, which leaves
+    Ctrl-C to the server.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    ttt.TIME_BUDGET = budget
+
+
+def search(board, k):
+    """
+    Returns minimax's move on the board with k in a row to win, in a
+    worker process.
+    """
+    return ttt.minimax(board, k=k)
+
+
+def check_board(board):
+    """
+    Raises ValueError unless board is a nonempty m x n board of X, O
+    and EMPTY.
+    """
+    if not isinstance(board, list) or not board:
+        raise ValueError("a board must be a nonempty list of rows")
+    n = len(board[0]) if isinstance(board[0], list) else 0
+    for row in board:
+        if not isinstance(row, list) or not row or len(row) != n:
+            raise ValueError("board rows must be nonempty lists of "
+                             "one length")
+        for cell in row:
+            if cell not in (ttt.X, ttt.O, ttt.EMPTY):
+                raise ValueError(f"bad cell {cell!r}")
+
+
+class MoveServer():
+    """
+    Answers move requests from the shared cache and the worker pool.
+    """
+
+    def __init__(self, workers=None, budget=ttt.TIME_BUDGET,
+                 cache_size=CACHE_SIZE):
+        self.workers = workers
+        self.budget = budget
+        self.pool = self.new_pool()
+        self.cache_size = cache_size
+        # (m, n, k, canonical key) -> move in the canonical orientation
+        self.cache = OrderedDict()
+        # Searches in progress, by the same keys
+        self.pending = {}
+        self.requests = 0
+        self.hits = 0
+        self.searches = 0
+
+    def new_pool(self):
+        return ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                   initargs=(self.budget,))
+
+    def close(self):
+        self.pool.shutdown()
+
+    async def move(self, board, k):
+        """
+        Returns the best move on the board, as [i, j], or None.
+        """
+        m, n = len(board), len(board[0])
+        key, symmetry = ttt.canonical(board)
+        entry = (m, n, k, key)
+        if entry in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(entry)
+            move = self.cache[entry]
+        else:
+            task = self.pending.get(entry)
+            if task is None:
+                task = asyncio.create_task(
+                    self.search(board, k, entry, symmetry))
+                self.pending[entry] = task
+            move = await task
+        if move is None:
+            return None
+        return list(ttt.transform(move, symmetry[1], n))
+
+    async def search(self, board, k, entry, symmetry):
+        """
+        Searches the board in the pool and caches its move, in the
+        canonical orientation.
+        """
+        self.searches += 1
+        loop = asyncio.get_running_loop()
+        pool = self.pool
+        try:
+            move = await loop.run_in_executor(pool, search, board, k)
+        except BrokenProcessPool:
+            # A worker died, which breaks the whole pool: start a new one
+            # for later searches, unless another failed search already has
+            if self.pool is pool:
+                pool.shutdown(wait=False)
+                self.pool = self.new_pool()
+            raise
+        finally:
+            del self.pending[entry]
+        if move is not None:
+            move = ttt.transform(move, symmetry[0], len(board[0]))
+        self.cache[entry] = move
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return move
+
+    async def respond(self, line):
+        """
+        Returns the reply to one request line.
+        """
+        self.requests += 1
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"id": None, "error": "request is not JSON"}
+        if not isinstance(request, dict):
+            return {"id": None, "error": "request is not a JSON object"}
+        reply = {"id": request.get("id")}
+        try:
+            boards = request.get("boards")
+            k = request.get("k", 3)
+            if not isinstance(boards, list):
+                raise ValueError("boards must be a list of boards")
+            if not isinstance(k, int) or isinstance(k, bool) or k < 1:
+                raise ValueError("k must be a positive integer")
+            for board in boards:
+                check_board(board)
+        except ValueError as e:
+            reply["error"] = str(e)
+            return reply
+        try:
+            reply["moves"] = await asyncio.gather(
+                *(self.move(board, k) for board in boards))
+        except Exception as e:
+            # Every request waiting on a failed search gets its error
+            reply["error"] = f"search failed: {e!r}"
+        return reply
+
+    async def handle(self, reader, writer):
+        """
+        Serves one client connection, replying to its requests in order.
+        """
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                reply = await self.respond(line)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # Client went away, or sent a line over LINE_LIMIT
+            pass
+        finally:
+            writer.close()
+
+    def stats(self):
+        return (f"{self.requests} requests, {self.hits} cache hits, "
+                f"{self.searches} searches, {len(self.cache)} positions "
+                f"cached")
+
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle, host, port,
+                                          limit=LINE_LIMIT)
+    print(f"Serving tictactoe moves on {host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve tictactoe moves.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="search processes (default: one per CPU)")
+    parser.add_argument("--budget", type=float, default=ttt.TIME_BUDGET,
+                        help="seconds per move on boards too large to "
+                             "solve")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE)
+    args = parser.parse_args()
+
+    server = MoveServer(args.workers, args.budget, args.cache_size)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print(server.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,127 @@
 """
 Tic Tac Toe Player
+
+Boards may be any m x n size (see initial_state), and K marks in a row
+win. The standard 3 x 3 game is solved exactly; larger boards are played
+with a time-limited iterative deepening search.
 """
 
 import math
-import copy
+import os
+import time
+from functools import lru_cache
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Number of marks in a row needed to win, for callers that pass no k
+K = 3
+
+# Seconds minimax may spend choosing a move on boards it cannot solve
+TIME_BUDGET = 1.0
+
+# Bound types of transposition table entries
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+@lru_cache(maxsize=None)
+def symmetries(m, n):
+    """
+    Returns the symmetries of an m x n board: its rotations and
+    reflections, 8 for a square board and 4 otherwise. Each is a tuple
+    (cells, inverse, n), where cells lists the cells n * i + j that the
+    cells 0, 1, ... move to, and inverse lists where they come from.
+    """
+    maps = [
+        lambda i, j: (i, j), lambda i, j: (m - 1 - i, n - 1 - j),
+        lambda i, j: (i, n - 1 - j), lambda i, j: (m - 1 - i, j),
+    ]
+    if m == n:
+        maps += [
+            lambda i, j: (j, n - 1 - i), lambda i, j: (n - 1 - j, i),
+            lambda i, j: (j, i), lambda i, j: (n - 1 - j, n - 1 - i),
+        ]
+    group = []
+    for f in maps:
+        cells = [n * i2 + j2 for i2, j2 in
+                 (f(i, j) for i in range(m) for j in range(n))]
+        inverse = [cells.index(k) for k in range(m * n)]
+        group.append((cells, inverse, n))
+    return group
+
+
+@lru_cache(maxsize=None)
+def lines(m, n, k):
+    """
+    Returns every line of k cells (i, j) in a row, column or diagonal
+    of an m x n board.
+    """
+    found = []
+    for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for i in range(m):
+            for j in range(n):
+                end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                if 0 <= end_i < m and 0 <= end_j < n:
+                    found.append(tuple((i + di * s, j + dj * s)
+                                       for s in range(k)))
+    return found
+
+
+# The symmetries of the standard board, as lists of where cells move to
+# and back (see symmetries)
+SYMMETRIES = [cells for cells, _, _ in symmetries(3, 3)]
+INVERSES = [inverse for _, inverse, _ in symmetries(3, 3)]
+
+# Opening book written by book.py: one byte per position, at the index
+# given by book_index(board), holding the cell 3 * i + j of the best move
+# or NO_MOVE. Read once at import; minimax searches when it is missing.
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         "book.bin")
+NO_MOVE = 255
+
+# Transposition table shared by every call to minimax: maps the canonical
+# key of a position to (value, bound type, best action), the action seen
+# in the canonical orientation. Alpha-beta values are bounds that stay
+# true for the position, and its symmetric copies, whatever window it is
+# searched with later.
+transpositions = {}
+
+
+def load_book(path=BOOK_FILE):
+    """
+    Returns the contents of the opening book at path, or None if it is
+    missing or not a book.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) != 3 ** 9:
+        return None
+    return data
+
+
+book = load_book()
+
+
+def parse_board(text):
+    """
+    Returns (m, n, k) from a board size and win length written as MxNxK,
+    like "4x4x3".
+    """
+    m, n, k = (int(part) for part in text.split("x"))
+    return m, n, k
+
 
-def initial_state():
+def initial_state(m=3, n=3):
     """
-    Returns starting state of the board.
+    Returns starting state of an m x n board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * n for _ in range(m)]
 
 
 def player(board):
@@ -25,8 +130,8 @@ def player(board):
     """
     x = 0
     o = 0
-    for i in range(3):
-        for j in range(3):
+    for i in range(len(board)):
+        for j in range(len(board[i])):
             if board[i][j] == X:
                 x += 1
             elif board[i][j] == O:
@@ -43,8 +148,8 @@ def actions(board):
     Returns set of all possible actions (i, j) available on the board.
     """
     action = []
-    for i in range(3):
-        for j in range(3):
+    for i in range(len(board)):
+        for j in range(len(board[i])):
             if board[i][j] == EMPTY:
                 action.append((i, j))
                 
@@ -61,50 +166,36 @@ def result(board, action):
     if board[i][j] != EMPTY:
         raise BaseException
     p = player(board)
-    newboard = copy.deepcopy(board)
+    newboard = [row[:] for row in board]
     newboard[i][j] = p
     
     return newboard
     
 
-def winner(board):
-    """
-    Returns the winner of the game, if there is one.
-    """
-    w = None
-    #检查行
-    for i in range(3):
-        j = 1
-        while j < 3 and board[i][j - 1] == board[i][j]:
-            j += 1
-        if j == 3:
-            w = board[i][0]
-            break
-    #检查列
-    for i in range(3):
-        j = 1
-        while j < 3 and board[j - 1][i] == board[j][i]:
-            j += 1
-        if j == 3:
-            w = board[0][i]
-            break
-    #检查对角线
-    i = 1
-    while i < 3 and board[i][i] == board[i - 1][i - 1]:
-        i += 1
-    if i == 3:
-        w = board[0][0]
-        
-    i = 1
-    while i < 3 and board[i][2 - i] == board[i - 1][3 - i]:
-        i += 1
-    if i == 3:
-        w = board[0][2]
-        
-    return w
+def winner(board, k=None):
+    """
+    Returns the winner of the game, if there is one, with k (K by
+    default) in a row to win.
+    """
+    if k is None:
+        k = K
+    #检查每一条K连线
+    for line in lines(len(board), len(board[0]), k):
+        i, j = line[0]
+        w = board[i][j]
+        #一行空格不算获胜
+        if w == EMPTY:
+            continue
+        for i, j in line[1:]:
+            if board[i][j] != w:
+                break
+        else:
+            return w
+
+    return None
 
 
-def terminal(board):
+def terminal(board, k=None):
     """
     Returns True if game is over, False otherwise.
     """
@@ -112,7 +203,7 @@ def terminal(board):
     #无法再做动作
     if action == []:
         return True
-    w = winner(board)
+    w = winner(board, k)
     #有胜者
     if w == X or w == O:
         return True
@@ -120,11 +211,11 @@ def terminal(board):
     return False
 
 
-def utility(board):
+def utility(board, k=None):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    w = winner(board)
+    w = winner(board, k)
     if w == X:
         return 1
     elif w == O:
@@ -160,59 +251,338 @@ def Min(board):
         
     return value, act
 
-def Max_prone(board, alpha, beta):
+def board_key(board):
+    """
+    Returns a hashable key for the position on the board.
+    """
+    return "".join(cell or "." for row in board for cell in row)
+
+def canonical(board):
+    """
+    Returns (key, symmetry) where key is the smallest board_key among the
+    symmetric copies of the board, and symmetry (one of symmetries(m, n))
+    turns the board into that copy. Symmetric positions share the same key.
+    """
+    cells = board_key(board)
+    best = None
+    for symmetry in symmetries(len(board), len(board[0])):
+        key = "".join([cells[k] for k in symmetry[1]])
+        if best is None or key < best:
+            best, best_symmetry = key, symmetry
+    return best, best_symmetry
+
+def transform(action, cells, n=3):
+    """
+    Returns where action (i, j) on a board n cells wide moves to under
+    the symmetry `cells`.
+    """
+    return divmod(cells[n * action[0] + action[1]], n)
+
+def book_index(board):
+    """
+    Returns the position of the board in the opening book: its cells read
+    as a base-3 number, with 0 for EMPTY, 1 for X and 2 for O.
+    """
+    index = 0
+    for row in reversed(board):
+        for cell in reversed(row):
+            index = 3 * index + (1 if cell == X else 2 if cell == O else 0)
+    return index
+
+def distinct_actions(board):
+    """
+    Returns the actions on the board whose results differ up to symmetry,
+    keeping the first of each group of symmetric moves.
+    """
+    seen = set()
+    action = []
+    for a in actions(board):
+        key = canonical(result(board, a))[0]
+        if key not in seen:
+            seen.add(key)
+            action.append(a)
+    return action
+
+def probe(table, key, symmetry, alpha, beta):
+    """
+    Returns (value, action) from the table entry for key if it decides
+    the search with window (alpha, beta), otherwise None. The stored
+    action is turned back from the canonical orientation.
+    """
+    entry = table.get(key)
+    if entry is None:
+        return None
+    value, bound, act = entry
+    if act is not None:
+        act = transform(act, symmetry[1], symmetry[2])
+    if bound == EXACT:
+        return min(max(value, alpha), beta), act
+    if bound == LOWER and value >= beta:
+        return beta, act
+    if bound == UPPER and value <= alpha:
+        return alpha, act
+    return None
+
+def store(table, key, symmetry, value, alpha, beta, act):
+    """
+    Records a value found with window (alpha, beta) in the table.
+    """
+    if act is not None:
+        act = transform(act, symmetry[0], symmetry[2])
+    if value <= alpha:
+        table[key] = (value, UPPER, act)
+    elif value >= beta:
+        table[key] = (value, LOWER, act)
+    else:
+        table[key] = (value, EXACT, act)
+
+def Max_prone(board, alpha, beta, table=None, moves=None):
     if terminal(board):
         return utility(board), None
+    if table is not None:
+        key, symmetry = canonical(board)
+        hit = probe(table, key, symmetry, alpha, beta)
+        if hit is not None:
+            return hit
+        alpha_orig = alpha
     act = None
-    action = actions(board)
+    action = actions(board) if moves is None else moves
     for a in action:
-        V, A = Min_prone(result(board, a), alpha, beta)
+        V, A = Min_prone(result(board, a), alpha, beta, table)
         if V > alpha:
             alpha = V
             act = a
         if alpha >= beta:
+            if table is not None:
+                store(table, key, symmetry, beta, alpha_orig, beta, act)
             return beta, act
         
+    if table is not None:
+        store(table, key, symmetry, alpha, alpha_orig, beta, act)
     return alpha, act
 
-def Min_prone(board, alpha, beta):
+def Min_prone(board, alpha, beta, table=None, moves=None):
     if terminal(board):
         return utility(board), None
+    if table is not None:
+        key, symmetry = canonical(board)
+        hit = probe(table, key, symmetry, alpha, beta)
+        if hit is not None:
+            return hit
+        beta_orig = beta
     act = None
-    action = actions(board)
+    action = actions(board) if moves is None else moves
     for a in action:
-        V, A = Max_prone(result(board, a), alpha, beta)
+        V, A = Max_prone(result(board, a), alpha, beta, table)
         if V < beta:
             beta = V
             act = a
         if alpha >= beta:
+            if table is not None:
+                store(table, key, symmetry, alpha, alpha, beta_orig, act)
             return alpha, act
         
+    if table is not None:
+        store(table, key, symmetry, beta, alpha, beta_orig, act)
     return beta, act
 
-'''
-def minimax(board):
+def evaluate(board, k=None):
     """
-    Returns the optimal action for the current player on the board.
+    Returns a heuristic value for a board, strictly between -1 and 1.
+    Every line of k (K by default) cells that only one player has marked
+    counts for that player, the more so the more of it they have marked.
     """
-    if terminal(board):
-        return None
-    p = player(board)
-    if p == X:
-        return Max(board)[-1]
-    else:
-        return Min(board)[-1]
-'''
-def minimax(board):
+    if k is None:
+        k = K
+    score = 0
+    for line in lines(len(board), len(board[0]), k):
+        x = o = 0
+        for i, j in line:
+            if board[i][j] == X:
+                x += 1
+            elif board[i][j] == O:
+                o += 1
+        if o == 0 and x > 0:
+            score += 4 ** x
+        elif x == 0 and o > 0:
+            score -= 4 ** o
+    return score / (abs(score) + 1)
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class Search():
     """
-    Returns the optimal action for the current player on the board.
+    State shared by the depth-limited searches for one move: the win
+    length, the time budget, the moves to try first, and counters.
+    Setting the optional `cancel` event (a threading.Event) stops the
+    search like running out of time does.
     """
-    if terminal(board):
+
+    def __init__(self, budget=None, cancel=None, k=None):
+        # Marks in a row needed to win
+        self.k = K if k is None else k
+        # Seconds allowed, counted from the call to start()
+        self.budget = budget
+        self.deadline = None
+        self.cancel = cancel
+        # Moves that caused a cutoff, at most two per ply
+        self.killers = {}
+        # Total depth**2 of the cutoffs caused by each move, at any ply
+        self.history = {}
+        # Best root move of the last completed iteration
+        self.best = None
+        self.nodes = 0
+        self.depth = 0
+        # Whether the current iteration stopped at a non-terminal board
+        self.cut_short = False
+
+    def start(self):
+        """
+        Starts the clock on the time budget.
+        """
+        if self.budget is not None:
+            self.deadline = time.perf_counter() + self.budget
+
+    def visit(self):
+        """
+        Counts a node, and raises SearchTimeout once the budget is spent
+        or the search is cancelled.
+        """
+        self.nodes += 1
+        if self.nodes % 64 == 0:
+            if self.cancel is not None and self.cancel.is_set():
+                raise SearchTimeout
+            if (self.deadline is not None
+                    and time.perf_counter() > self.deadline):
+                raise SearchTimeout
+
+    def order(self, board, ply):
+        """
+        Returns the actions on the board, most promising first: the
+        previous best move at the root, then killer moves, then by history
+        score, then closest to the center.
+        """
+        killers = self.killers.get(ply, ())
+        center_i, center_j = (len(board) - 1) / 2, (len(board[0]) - 1) / 2
+
+        def priority(a):
+            return (not (ply == 0 and a == self.best),
+                    a not in killers,
+                    -self.history.get(a, 0),
+                    abs(a[0] - center_i) + abs(a[1] - center_j))
+        return sorted(actions(board), key=priority)
+
+    def cutoff(self, action, ply, depth):
+        """
+        Records that action caused a cutoff at ply, depth plies from the
+        search horizon.
+        """
+        killers = self.killers.setdefault(ply, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+        self.history[action] = self.history.get(action, 0) + depth * depth
+
+def Max_limited(board, depth, alpha, beta, search, ply=0):
+    if terminal(board, search.k):
+        return utility(board, search.k), None
+    search.visit()
+    if depth == 0:
+        search.cut_short = True
+        return evaluate(board, search.k), None
+    act = None
+    for a in search.order(board, ply):
+        V, A = Min_limited(result(board, a), depth - 1, alpha, beta,
+                           search, ply + 1)
+        if V > alpha:
+            alpha = V
+            act = a
+        if alpha >= beta:
+            search.cutoff(a, ply, depth)
+            return beta, act
+
+    return alpha, act
+
+def Min_limited(board, depth, alpha, beta, search, ply=0):
+    if terminal(board, search.k):
+        return utility(board, search.k), None
+    search.visit()
+    if depth == 0:
+        search.cut_short = True
+        return evaluate(board, search.k), None
+    act = None
+    for a in search.order(board, ply):
+        V, A = Max_limited(result(board, a), depth - 1, alpha, beta,
+                           search, ply + 1)
+        if V < beta:
+            beta = V
+            act = a
+        if alpha >= beta:
+            search.cutoff(a, ply, depth)
+            return alpha, act
+
+    return beta, act
+
+def iterative_deepening(board, search=None, max_depth=None):
+    """
+    Returns the best action for the current player found by depth-limited
+    alpha-beta searches of depth 1, 2, ... until the budget of `search`
+    runs out, a search reaches the end of the game on every line, or
+    max_depth is searched.
+    """
+    if search is None:
+        search = Search(TIME_BUDGET)
+    limited = Max_limited if player(board) == X else Min_limited
+    if max_depth is None:
+        max_depth = len(actions(board))
+    search.start()
+    depth = 0
+    try:
+        while depth < max_depth:
+            depth += 1
+            search.cut_short = False
+            value, act = limited(board, depth, -1e9, 1e9, search)
+            search.best = act
+            search.depth = depth
+            # A won or lost game, or a complete search, cannot change
+            if abs(value) == 1 or not search.cut_short:
+                break
+    except SearchTimeout:
+        pass
+    if search.best is None:
+        # Not even one ply searched in time
+        return search.order(board, 0)[0]
+    return search.best
+
+def minimax(board, cancel=None, k=None, budget=None, use_book=True):
+    """
+    Returns the optimal action for the current player on the board, with
+    k (K by default) in a row to win. On boards too large to solve,
+    returns the best action found within `budget` (TIME_BUDGET by
+    default) seconds, or sooner once the `cancel` event is set. The
+    opening book is skipped unless `use_book` is true.
+    """
+    if k is None:
+        k = K
+    if budget is None:
+        budget = TIME_BUDGET
+    if terminal(board, k):
         return None
+    if len(board) != 3 or len(board[0]) != 3 or k != 3:
+        return iterative_deepening(board, Search(budget, cancel, k))
+    if use_book and book is not None:
+        move = book[book_index(board)]
+        if move != NO_MOVE:
+            return divmod(move, 3)
     p = player(board)
     alpha = -1e9
     beta = 1e9
+    # Only one move of each group of symmetric moves needs searching
+    moves = distinct_actions(board)
     if p == X:
-        return Max_prone(board, alpha, beta)[-1]
+        return Max_prone(board, alpha, beta, transpositions, moves)[-1]
     else:
-        return Min_prone(board, alpha, beta)[-1]
+        return Min_prone(board, alpha, beta, transpositions, moves)[-1]
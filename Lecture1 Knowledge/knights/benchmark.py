@@ -0,0 +1,142 @@
+"""
+Compares the entailment backends of logic.model_check on growing
+knights and knaves puzzles.
+
+Each puzzle has N characters, each either a knight (who only tells the
+truth) or a knave (who only lies), and each says one thing about the
+others, written the way puzzle.py writes its puzzles. The roles are
+drawn first and the statements made to fit them, so every puzzle has a
+solution. For each puzzle the time to check every "X is a Knight" and
+"X is a Knave" is measured with each backend, along with the (partial)
+models visited by full enumeration and by the DPLL search.
+
+Usage: python benchmark.py [--sizes N ...] [--enumerate-up-to N]
+                           [--dpll-up-to N] [--compile-up-to N] [--seed N]
+"""
+
+import argparse
+import random
+import time
+
+import logic
+from logic import And, Not, Or, Symbol
+
+
+def statement(others, knight, knave, rng):
+    """
+    Returns a random sentence about some of the characters `others`.
+    """
+    y, z = rng.sample(others, 2) if len(others) > 1 else others * 2
+    kind = rng.randrange(4)
+    if kind == 0:
+        return knave[y]
+    if kind == 1:
+        return knight[y]
+    if kind == 2:
+        # "Y and Z are the same kind."
+        return Or(And(knight[y], knight[z]), And(knave[y], knave[z]))
+    # "Y or Z is a knave."
+    return Or(knave[y], knave[z])
+
+
+def puzzle(size, rng):
+    """
+    Returns (knowledge, symbols, roles) for a random puzzle with `size`
+    characters, where roles maps each character to True for a knight.
+    """
+    names = [f"C{i}" for i in range(size)]
+    knight = {name: Symbol(f"{name} is a Knight") for name in names}
+    knave = {name: Symbol(f"{name} is a Knave") for name in names}
+    roles = {name: rng.random() < 0.5 for name in names}
+    model = {}
+    for name in names:
+        model[knight[name].name] = roles[name]
+        model[knave[name].name] = not roles[name]
+
+    knowledge = And()
+    for name in names:
+        others = [other for other in names if other != name]
+        said = statement(others, knight, knave, rng)
+        # A knight's statement is true, and a knave's false
+        if said.evaluate(model) != roles[name]:
+            said = Not(said)
+        knowledge.add(Or(And(knight[name], said),
+                         And(knave[name], Not(said))))
+        # Exactly one of knight and knave
+        knowledge.add(Or(And(knight[name], Not(knave[name])),
+                         And(knave[name], Not(knight[name]))))
+    symbols = [knight[name] for name in names] + [
+        knave[name] for name in names]
+    return knowledge, symbols, roles
+
+
+# Backends that count the models they visit
+COUNTING = {
+    "enumerate": logic.entails_by_enumeration,
+    "dpll": logic.entails_by_dpll,
+}
+
+
+def solve(knowledge, symbols, backend):
+    """
+    Returns (names of the symbols entailed, seconds taken, models
+    visited or None) with the given backend.
+    """
+    stats = {"nodes": 0} if backend in COUNTING else None
+    start = time.perf_counter()
+    if stats is None:
+        entailed = [symbol.name for symbol in symbols
+                    if logic.BACKENDS[backend](knowledge, symbol)]
+    else:
+        entailed = [symbol.name for symbol in symbols
+                    if COUNTING[backend](knowledge, symbol, stats)]
+    nodes = None if stats is None else stats["nodes"]
+    return entailed, time.perf_counter() - start, nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare entailment "
+                                                 "backends.")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[2, 3, 4, 5, 6, 7, 8, 10, 20, 40, 80],
+                        help="numbers of characters")
+    parser.add_argument("--enumerate-up-to", type=int, default=7,
+                        help="largest puzzle to enumerate models for")
+    parser.add_argument("--dpll-up-to", type=int, default=20,
+                        help="largest puzzle to search with DPLL")
+    parser.add_argument("--compile-up-to", type=int, default=10,
+                        help="largest puzzle to check every model of with "
+                             "the compiled evaluator")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    limits = {"enumerate": args.enumerate_up_to,
+              "dpll": args.dpll_up_to,
+              "compiled": args.compile_up_to}
+    print(f"{'':>16}{'enumerate':>17}{'dpll':>17}")
+    print(f"{'people':>7}{'symbols':>9}{'s':>8}{'nodes':>9}{'s':>8}"
+          f"{'nodes':>9}{'compiled s':>12}{'sat s':>8}{'same':>6}")
+    for size in args.sizes:
+        knowledge, symbols, roles = puzzle(size, rng)
+        entailed, sat_time, _ = solve(knowledge, symbols, "sat")
+        same = "yes"
+        times = {}
+        nodes = {}
+        for backend, limit in limits.items():
+            times[backend] = nodes[backend] = "-"
+            if size <= limit:
+                found, seconds, count = solve(knowledge, symbols, backend)
+                if found != entailed:
+                    same = "NO"
+                times[backend] = f"{seconds:.3f}"
+                if count is not None:
+                    nodes[backend] = count
+        print(f"{size:>7}{len(symbols):>9}"
+              f"{times['enumerate']:>8}{nodes['enumerate']:>9}"
+              f"{times['dpll']:>8}{nodes['dpll']:>9}"
+              f"{times['compiled']:>12}{sat_time:>8.3f}{same:>6}")
+
+
+if __name__ == "__main__":
+    main()
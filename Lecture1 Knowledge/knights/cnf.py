@@ -0,0 +1,178 @@
+"""
+Tseitin conversion of logic sentences to CNF.
+
+Distributing ∨ over ∧ can make a CNF exponentially larger than the
+sentence it came from: every Or(And(...), And(...)) in puzzle.py
+multiplies the clauses of its two sides. Instead, CNF gives each
+connective a variable of its own, with a few clauses saying that the
+variable is true exactly when the connective is, so the clauses grow
+linearly with the sentence:
+
+    x <=> a ∧ b      (¬x ∨ a), (¬x ∨ b), (x ∨ ¬a ∨ ¬b)
+    x <=> a ∨ b      (¬x ∨ a ∨ b), (x ∨ ¬a), (x ∨ ¬b)
+    x <=> (a <=> b)  (¬x ∨ ¬a ∨ b), (¬x ∨ a ∨ ¬b), (x ∨ a ∨ b),
+                     (x ∨ ¬a ∨ ¬b)
+
+Not needs no variable (it negates the literal), and Implication is
+written as an Or. Connectives are looked up by the literals of their
+operands, so a subformula that appears more than once, even as another
+object or with its operands in another order, gets one variable.
+
+Literals are nonzero integers, as in the DIMACS format: variable v is v
+when true and -v when false.
+
+Usage: python cnf.py [puzzle number]
+"""
+
+import sys
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+
+class CNF():
+    """
+    Clauses over integer literals, equisatisfiable with the sentences
+    added to them.
+    """
+
+    def __init__(self):
+        # Symbol name -> variable, and variable -> symbol name (None for
+        # the variables of connectives)
+        self.variables = {}
+        self.names = [None]
+        # Clauses, as tuples of literals
+        self.clauses = []
+        # (connective, operand literals) -> literal
+        self.connectives = {}
+        # Literal that is always true, once needed
+        self.true = None
+
+    def new_variable(self, name=None):
+        self.names.append(name)
+        return len(self.names) - 1
+
+    def constant(self, value):
+        """
+        Returns a literal that is always `value`.
+        """
+        if self.true is None:
+            self.true = self.new_variable()
+            self.clauses.append((self.true,))
+        return self.true if value else -self.true
+
+    def literal(self, sentence):
+        """
+        Returns a literal that is true exactly when the sentence is,
+        adding the clauses that define it.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.new_variable(
+                    sentence.name)
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if isinstance(sentence, And):
+            return self.conjunction(
+                [self.literal(conjunct) for conjunct in sentence.conjuncts])
+        if isinstance(sentence, Or):
+            return -self.conjunction(
+                [-self.literal(disjunct) for disjunct in sentence.disjuncts])
+        if isinstance(sentence, Implication):
+            return -self.conjunction([self.literal(sentence.antecedent),
+                                      -self.literal(sentence.consequent)])
+        if isinstance(sentence, Biconditional):
+            return self.biconditional(self.literal(sentence.left),
+                                      self.literal(sentence.right))
+        raise TypeError(f"cannot convert {sentence!r} to CNF")
+
+    def conjunction(self, literals):
+        """
+        Returns a literal for the conjunction of some literals. A
+        disjunction is the negation of the conjunction of the negations.
+        """
+        operands = tuple(sorted(set(literals), key=abs))
+        if any(-literal in operands for literal in operands):
+            return self.constant(False)
+        if self.true is not None and -self.true in operands:
+            return self.constant(False)
+        operands = tuple(literal for literal in operands
+                         if literal != self.true)
+        if not operands:
+            return self.constant(True)
+        if len(operands) == 1:
+            return operands[0]
+        key = ("and", operands)
+        if key not in self.connectives:
+            x = self.new_variable()
+            for literal in operands:
+                self.clauses.append((-x, literal))
+            self.clauses.append((x,) + tuple(-literal
+                                             for literal in operands))
+            self.connectives[key] = x
+        return self.connectives[key]
+
+    def biconditional(self, a, b):
+        """
+        Returns a literal for a <=> b.
+        """
+        if a == b:
+            return self.constant(True)
+        if a == -b:
+            return self.constant(False)
+        # a <=> b is ¬a <=> ¬b, and ¬(a <=> ¬b)
+        negated = (a < 0) != (b < 0)
+        a, b = sorted((abs(a), abs(b)))
+        key = ("iff", a, b)
+        if key not in self.connectives:
+            x = self.new_variable()
+            self.clauses += [(-x, -a, b), (-x, a, -b), (x, a, b),
+                             (x, -a, -b)]
+            self.connectives[key] = x
+        x = self.connectives[key]
+        return -x if negated else x
+
+    def add(self, sentence):
+        """
+        Adds clauses that hold exactly when the sentence is true (given
+        the variables of its connectives).
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            # A clause of its own, with no variable for the Or
+            self.clauses.append(tuple(self.literal(disjunct)
+                                      for disjunct in sentence.disjuncts))
+        elif isinstance(sentence, Implication):
+            self.clauses.append((-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)))
+        else:
+            self.clauses.append((self.literal(sentence),))
+
+    def dimacs(self):
+        """
+        Returns the clauses in DIMACS CNF format, with a comment naming
+        the variable of each symbol.
+        """
+        lines = [f"c {v} {name}" for v, name in enumerate(self.names)
+                 if name is not None]
+        lines.append(f"p cnf {len(self.names) - 1} {len(self.clauses)}")
+        lines += [" ".join(map(str, clause)) + " 0"
+                  for clause in self.clauses]
+        return "\n".join(lines) + "\n"
+
+
+def main():
+    import puzzle
+
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python cnf.py [puzzle number]")
+    number = int(sys.argv[1]) if len(sys.argv) == 2 else 3
+    cnf = CNF()
+    cnf.add(getattr(puzzle, f"knowledge{number}"))
+    sys.stdout.write(cnf.dimacs())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Compiled, word-parallel evaluation of logic sentences.
+
+Sentence.evaluate walks the sentence tree for one model at a time, and
+looks each symbol up in a dict. Compiled instead generates a Python
+function for the sentence once, over integers: bit b of the argument for
+a symbol holds its value in model b, and bit b of the result the value
+of the sentence in that model, so one call evaluates a whole word of 64
+models with bitwise operations:
+
+    Not(a)                 MASK ^ a
+    And(a, b, ...)         a & b & ...
+    Or(a, b, ...)          a | b | ...
+    Implication(a, b)      MASK ^ a | b
+    Biconditional(a, b)    MASK ^ (a ^ b)
+
+where MASK has a bit set for each model in the word. Each subformula is
+computed once, into a local variable, however often it appears.
+
+Model number i gives symbol j the value of bit j of i, in the order of
+Compiled.symbols. In each word of 64 models, the first six symbols take
+every combination of values (see PATTERNS), and the rest are the same in
+every model.
+"""
+
+from logic import Symbol, Not, And, Or, Implication, Biconditional
+
+WORD = 64
+LOG_WORD = 6
+
+# PATTERNS[j]: the word of symbol j < LOG_WORD, set in the models whose
+# number has bit j set
+PATTERNS = [sum(1 << i for i in range(WORD) if i >> j & 1)
+            for j in range(LOG_WORD)]
+
+
+class Compiled():
+    """
+    A sentence compiled to a function over words of models.
+    """
+
+    def __init__(self, sentence, symbols=None):
+        if symbols is None:
+            symbols = sorted(sentence.symbols())
+        self.symbols = list(symbols)
+        self.index = {name: j for j, name in enumerate(self.symbols)}
+        # Generated code, one assignment per subformula
+        self.lines = []
+        self.names = {}
+        result = self.compile(sentence)
+        arguments = ", ".join(f"s{j}" for j in range(len(self.symbols)))
+        self.source = "\n".join(
+            [f"def evaluate({arguments}{', ' if arguments else ''}MASK):"]
+            + [f"    {line}" for line in self.lines]
+            + [f"    return {result}"]
+        ) + "\n"
+        namespace = {}
+        exec(self.source, namespace)
+        self.function = namespace["evaluate"]
+
+    def compile(self, sentence):
+        """
+        Returns the name of the local variable (or argument) holding the
+        word of the sentence, generating the code to compute it.
+        """
+        if isinstance(sentence, Symbol):
+            return f"s{self.index[sentence.name]}"
+        if sentence in self.names:
+            return self.names[sentence]
+        if isinstance(sentence, Not):
+            expression = f"MASK ^ {self.compile(sentence.operand)}"
+        elif isinstance(sentence, And):
+            expression = " & ".join(
+                [self.compile(conjunct) for conjunct in sentence.conjuncts]
+            ) or "MASK"
+        elif isinstance(sentence, Or):
+            expression = " | ".join(
+                [self.compile(disjunct) for disjunct in sentence.disjuncts]
+            ) or "0"
+        elif isinstance(sentence, Implication):
+            expression = (f"MASK ^ {self.compile(sentence.antecedent)} | "
+                          f"{self.compile(sentence.consequent)}")
+        elif isinstance(sentence, Biconditional):
+            expression = (f"MASK ^ ({self.compile(sentence.left)} ^ "
+                          f"{self.compile(sentence.right)})")
+        else:
+            raise TypeError(f"cannot compile {sentence!r}")
+        name = f"t{len(self.lines)}"
+        self.lines.append(f"{name} = {expression}")
+        self.names[sentence] = name
+        return name
+
+    def evaluate(self, model):
+        """
+        Evaluates the sentence in one model, a dict like the ones
+        Sentence.evaluate takes.
+        """
+        try:
+            words = [1 if model[name] else 0 for name in self.symbols]
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
+        return bool(self.function(*words, 1))
+
+    def words(self):
+        """
+        Yields (first model number, word) for each word of models in
+        turn, covering every model of the symbols.
+        """
+        n = len(self.symbols)
+        low = min(n, LOG_WORD)
+        mask = (1 << (1 << low)) - 1
+        patterns = [pattern & mask for pattern in PATTERNS[:low]]
+        for block in range(1 << (n - low)):
+            high = [mask if block >> j & 1 else 0 for j in range(n - low)]
+            yield block << low, self.function(*patterns, *high, mask)
+
+    def satisfiable(self):
+        """
+        Returns True if the sentence is true in some model.
+        """
+        return any(word for _, word in self.words())
+
+    def models(self):
+        """
+        Yields every model the sentence is true in, as a dict.
+        """
+        for first, word in self.words():
+            while word:
+                bit = word & -word
+                word ^= bit
+                number = first + bit.bit_length() - 1
+                yield {name: bool(number >> j & 1)
+                       for j, name in enumerate(self.symbols)}
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, by checking every model of
+    knowledge ∧ ¬query a word at a time.
+    """
+    return not Compiled(And(knowledge, Not(query))).satisfiable()
@@ -1,4 +1,5 @@
 import itertools
+import weakref
 
 
 class Sentence():
@@ -7,6 +8,11 @@ class Sentence():
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """Evaluates the logical sentence in a model that may leave out
+        some symbols: True or False if that decides it, None if not."""
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -62,6 +68,10 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
@@ -86,6 +96,10 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
@@ -100,7 +114,8 @@ class And(Sentence):
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return (isinstance(other, And)
+                and tuple(self.conjuncts) == tuple(other.conjuncts))
 
     def __hash__(self):
         return hash(
@@ -120,6 +135,16 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -127,7 +152,8 @@ class And(Sentence):
                            for conjunct in self.conjuncts])
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return set().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts])
 
 
 class Or(Sentence):
@@ -137,7 +163,8 @@ class Or(Sentence):
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return (isinstance(other, Or)
+                and tuple(self.disjuncts) == tuple(other.disjuncts))
 
     def __hash__(self):
         return hash(
@@ -151,6 +178,16 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -158,7 +195,8 @@ class Or(Sentence):
                             for disjunct in self.disjuncts])
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return set().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts])
 
 
 class Implication(Sentence):
@@ -183,13 +221,25 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        return set().union(self.antecedent.symbols(),
+                           self.consequent.symbols())
 
 
 class Biconditional(Sentence):
@@ -216,20 +266,146 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+        return set().union(self.left.symbols(), self.right.symbols())
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+class Frozen():
+    """
+    Immutable, interned sentence, made by freeze(). Its hash and its
+    symbols are worked out once, when it is made, and since there is
+    only ever one frozen copy of a sentence, two frozen sentences are
+    equal only if they are the same object.
+    """
+
+    def __setattr__(self, name, value):
+        raise AttributeError("frozen sentences cannot be changed")
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, Frozen):
+            return False
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return self._hash
+
+    def symbols(self):
+        return self._symbols
+
+
+class FrozenSymbol(Frozen, Symbol):
+    pass
+
+
+class FrozenNot(Frozen, Not):
+    pass
+
+
+class FrozenAnd(Frozen, And):
+    def add(self, conjunct):
+        raise TypeError("cannot add to a frozen And")
+
+
+class FrozenOr(Frozen, Or):
+    pass
+
+
+class FrozenImplication(Frozen, Implication):
+    pass
+
+
+class FrozenBiconditional(Frozen, Biconditional):
+    pass
+
+
+# Every frozen sentence still in use, by its class and the name or the
+# (frozen, so interned) operands it was made from
+interned = weakref.WeakValueDictionary()
+
+
+def freeze(sentence, frozen=None):
+    """
+    Returns the frozen copy of a sentence, built from frozen copies of
+    its parts, so that each distinct subformula is kept once however
+    often it appears. `frozen` maps the ids of parts already frozen in
+    this call to their copies.
+    """
+    if isinstance(sentence, Frozen):
+        return sentence
+    if frozen is None:
+        frozen = {}
+    if id(sentence) in frozen:
+        return frozen[id(sentence)]
+
+    if isinstance(sentence, Symbol):
+        cls, fields = FrozenSymbol, {"name": sentence.name}
+    elif isinstance(sentence, Not):
+        cls, fields = FrozenNot, {"operand": freeze(sentence.operand, frozen)}
+    elif isinstance(sentence, And):
+        cls, fields = FrozenAnd, {"conjuncts": tuple(
+            freeze(conjunct, frozen) for conjunct in sentence.conjuncts)}
+    elif isinstance(sentence, Or):
+        cls, fields = FrozenOr, {"disjuncts": tuple(
+            freeze(disjunct, frozen) for disjunct in sentence.disjuncts)}
+    elif isinstance(sentence, Implication):
+        cls, fields = FrozenImplication, {
+            "antecedent": freeze(sentence.antecedent, frozen),
+            "consequent": freeze(sentence.consequent, frozen)}
+    elif isinstance(sentence, Biconditional):
+        cls, fields = FrozenBiconditional, {
+            "left": freeze(sentence.left, frozen),
+            "right": freeze(sentence.right, frozen)}
+    else:
+        raise TypeError(f"cannot freeze {sentence!r}")
+
+    # Operands are interned, so the same objects stand for the same parts
+    key = (cls,) + tuple(
+        value if isinstance(value, str)
+        else tuple(map(id, value)) if isinstance(value, tuple)
+        else id(value)
+        for value in fields.values()
+    )
+    copy = interned.get(key)
+    if copy is None:
+        copy = object.__new__(cls)
+        for name, value in fields.items():
+            object.__setattr__(copy, name, value)
+        # As the unfrozen sentence would, but from the operands' cached
+        # values rather than by walking the whole tree
+        object.__setattr__(copy, "_hash", super(Frozen, copy).__hash__())
+        object.__setattr__(copy, "_symbols",
+                           frozenset(super(Frozen, copy).symbols()))
+        interned[key] = copy
+    frozen[id(sentence)] = copy
+    return copy
+
+
+def entails_by_enumeration(knowledge, query, stats=None):
+    """Checks if knowledge base entails query, by enumerating all models.
+    Counts the models and partial models visited in stats["nodes"]."""
+    if stats is None:
+        stats = {}
+    stats.setdefault("nodes", 0)
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
+        stats["nodes"] += 1
 
         # If model has an assignment for each symbol
         if not symbols:
@@ -257,7 +433,167 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set().union(knowledge.symbols(), query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def polarities(sentence, model, positive=True, found=None):
+    """Returns a dict from each symbol of the sentence not in model to the
+    set of signs it appears with: True where making it true can only
+    make the sentence truer, False where the opposite."""
+    if found is None:
+        found = {}
+    if isinstance(sentence, Symbol):
+        if sentence.name not in model:
+            found.setdefault(sentence.name, set()).add(positive)
+    elif isinstance(sentence, Not):
+        polarities(sentence.operand, model, not positive, found)
+    elif isinstance(sentence, (And, Or)):
+        operands = (sentence.conjuncts if isinstance(sentence, And)
+                    else sentence.disjuncts)
+        for operand in operands:
+            polarities(operand, model, positive, found)
+    elif isinstance(sentence, Implication):
+        polarities(sentence.antecedent, model, not positive, found)
+        polarities(sentence.consequent, model, positive, found)
+    elif isinstance(sentence, Biconditional):
+        for side in (sentence.left, sentence.right):
+            polarities(side, model, True, found)
+            polarities(side, model, False, found)
+    return found
+
+
+def entails_by_dpll(knowledge, query, stats=None):
+    """Checks if knowledge base entails query, by a DPLL search for a model
+    of knowledge ∧ ¬query that gives up on a partial model as soon as it
+    makes the sentence false. Counts the partial models visited in
+    stats["nodes"]."""
+    if stats is None:
+        stats = {}
+    stats.setdefault("nodes", 0)
+
+    # The parts of knowledge ∧ ¬query that must all be true
+    conjuncts = []
+    pending = [knowledge, Not(query)]
+    while pending:
+        sentence = pending.pop()
+        if isinstance(sentence, And):
+            pending.extend(reversed(sentence.conjuncts))
+        else:
+            conjuncts.append(sentence)
+    symbols = [sorted(sentence.symbols()) for sentence in conjuncts]
+
+    def forced(model, undecided):
+        """Returns (symbol, value) for a symbol whose value the undecided
+        conjuncts force, or that can be set without losing any model, or
+        None. Returns (None, None) if no value of some symbol will do."""
+
+        # Unit propagation: a conjunct with one symbol left may allow only
+        # one value for it
+        for i in undecided:
+            left = [p for p in symbols[i] if p not in model]
+            if len(left) == 1:
+                p = left[0]
+                model[p] = True
+                when_true = conjuncts[i].evaluate_partial(model)
+                model[p] = False
+                when_false = conjuncts[i].evaluate_partial(model)
+                del model[p]
+                if when_true is False and when_false is False:
+                    return None, None
+                if when_true is False:
+                    return p, False
+                if when_false is False:
+                    return p, True
+
+        # Pure literals: a symbol that only ever helps the sentence when
+        # true (or when false) may as well be true (or false)
+        found = {}
+        for i in undecided:
+            polarities(conjuncts[i], model, True, found)
+        for p, signs in found.items():
+            if len(signs) == 1:
+                return p, signs.pop()
+        return None
+
+    def search(model):
+        """Returns True if model can be extended to a model of knowledge
+        ∧ ¬query, given every symbol it has so far."""
+        stats["nodes"] += 1
+        assigned = []
+        try:
+            while True:
+                # Stop as soon as some conjunct is false
+                undecided = []
+                for i, conjunct in enumerate(conjuncts):
+                    value = conjunct.evaluate_partial(model)
+                    if value is False:
+                        return False
+                    if value is None:
+                        undecided.append(i)
+                if not undecided:
+                    return True
+
+                found = forced(model, undecided)
+                if found is None:
+                    break
+                p, value = found
+                if p is None:
+                    return False
+                model[p] = value
+                assigned.append(p)
+
+            # Branch on a symbol of the first undecided conjunct
+            p = next(p for p in symbols[undecided[0]] if p not in model)
+            assigned.append(p)
+            for value in (True, False):
+                model[p] = value
+                if search(model):
+                    return True
+            return False
+        finally:
+            for p in assigned:
+                model.pop(p, None)
+
+    return not search(dict())
+
+
+def entails_by_sat(knowledge, query):
+    """Checks if knowledge base entails query, with the SAT solver."""
+    import sat
+    return sat.entails(knowledge, query)
+
+
+def entails_by_compiling(knowledge, query):
+    """Checks if knowledge base entails query, checking 64 models at once."""
+    import compiled
+    return compiled.entails(knowledge, query)
+
+
+# Ways model_check can decide entailment, by name
+BACKENDS = {
+    "enumerate": entails_by_enumeration,
+    "dpll": entails_by_dpll,
+    "compiled": entails_by_compiling,
+    "sat": entails_by_sat,
+}
+
+# Backend model_check uses: one of BACKENDS, or "auto" to search partial
+# models with DPLL when there are at most DPLL_LIMIT symbols and use the
+# SAT solver otherwise
+BACKEND = "auto"
+DPLL_LIMIT = 12
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
+    backend = BACKEND
+    if backend == "auto":
+        symbols = set().union(knowledge.symbols(), query.symbols())
+        if len(symbols) <= DPLL_LIMIT:
+            backend = "dpll"
+        else:
+            backend = "sat"
+    return BACKENDS[backend](knowledge, query)
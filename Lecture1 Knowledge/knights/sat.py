@@ -0,0 +1,332 @@
+"""
+SAT backend for logic.model_check.
+
+Knowledge entails a query exactly when knowledge ∧ ¬query has no model.
+entails() converts that sentence to clauses with cnf.CNF and looks for a
+model with Solver, a conflict-driven clause learning (CDCL) solver:
+
+- every clause watches two of its literals, and is only looked at when
+  one of them becomes false
+- a conflict is analyzed back to its first unique implication point,
+  and the clause learned from it sends the search back as far as it can
+- the variable to decide on next is the one most active in recent
+  conflicts (VSIDS), and it is given the value it last had
+- the search restarts from scratch after a number of conflicts that
+  follows the Luby sequence, keeping what it has learned
+
+Literals are nonzero integers, as in the DIMACS format: variable v is v
+when true and -v when false.
+"""
+
+import heapq
+
+from cnf import CNF
+from logic import Not
+
+# Conflicts between restarts, times the Luby sequence 1, 1, 2, 1, 1, 2, 4...
+RESTART_BASE = 100
+
+# Activity bump growth per conflict, and the point where all activities
+# are scaled back down
+ACTIVITY_DECAY = 0.95
+ACTIVITY_LIMIT = 1e100
+
+
+def luby(i):
+    """
+    Returns the i-th term (from 1) of the Luby sequence.
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class Solver():
+    """
+    CDCL SAT solver over clauses of integer literals.
+    """
+
+    def __init__(self, clauses=()):
+        # Per variable, from 1: True, False or None, the decision level it
+        # was assigned at, the clause that implied it (None for decisions)
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        # Value each variable had last, tried first when deciding on it
+        self.phases = [False]
+        self.bump = 1.0
+        # Unassigned variables, as (-activity, variable), maybe stale
+        self.order = []
+        # Literal -> clauses watching it
+        self.watches = {}
+        self.clauses = []
+        self.learned = []
+        # Assigned literals in order, where each decision level starts in
+        # it, and the first one not yet propagated
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        # False once the clauses are known to have no model
+        self.ok = True
+        self.decisions = 0
+        self.conflicts = 0
+        self.propagations = 0
+        self.restarts = 0
+        self.model = None
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def variables(self):
+        return len(self.values) - 1
+
+    def new_variable(self):
+        """
+        Adds a variable and returns it.
+        """
+        self.values.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        v = len(self.values) - 1
+        self.watches[v] = []
+        self.watches[-v] = []
+        heapq.heappush(self.order, (0.0, v))
+        return v
+
+    def value(self, literal):
+        """
+        Returns True, False or None for the literal.
+        """
+        value = self.values[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause, a disjunction of literals, before solving. Returns
+        False if the clauses now have no model.
+        """
+        if not self.ok:
+            return False
+        clause = []
+        for literal in literals:
+            while abs(literal) > self.variables():
+                self.new_variable()
+            if -literal in clause:
+                # Always true
+                return True
+            if literal not in clause:
+                clause.append(literal)
+        # Leave out literals already false, and clauses already true
+        if any(self.value(literal) is True for literal in clause):
+            return True
+        clause = [literal for literal in clause
+                  if self.value(literal) is None]
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.watch(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.values[v] = literal > 0
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by a clause with all other literals
+        false. Returns a clause that became false, or None.
+        """
+        values = self.values
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            watching = watches[false]
+            kept = []
+            for index, clause in enumerate(watching):
+                # Keep the false literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[abs(first)]
+                if value is not None and value == (first > 0):
+                    kept.append(clause)
+                    continue
+                # Look for another literal to watch that is not false
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    value = values[abs(literal)]
+                    if value is None or value == (literal > 0):
+                        clause[1], clause[k] = literal, false
+                        watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[abs(first)] is not None:
+                        # Every literal is false
+                        kept.extend(watching[index + 1:])
+                        watches[false] = kept
+                        return clause
+                    self.assign(first, clause)
+            watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (learned clause, level to go back to) for a conflict. The
+        learned clause is implied by the others, and its first literal is
+        the only one at the current level (the first unique implication
+        point), so that it is implied once the search goes back.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for q in clause if literal is None else clause[1:]:
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump_activity(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learned.append(q)
+            # The latest assigned literal of the conflict to resolve on
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal from the highest level below this one second
+        second = max(range(1, len(learned)),
+                     key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[second] = learned[second], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump_activity(self, v):
+        self.activity[v] += self.bump
+        if self.activity[v] > ACTIVITY_LIMIT:
+            self.activity = [a / ACTIVITY_LIMIT for a in self.activity]
+            self.bump /= ACTIVITY_LIMIT
+            self.order = [(-self.activity[u], u)
+                          for u in range(1, len(self.values))
+                          if self.values[u] is None]
+            heapq.heapify(self.order)
+        elif self.values[v] is None:
+            heapq.heappush(self.order, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        """
+        Undoes every assignment above the decision level.
+        """
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            v = abs(literal)
+            self.phases[v] = literal > 0
+            self.values[v] = None
+            self.reasons[v] = None
+            heapq.heappush(self.order, (-self.activity[v], v))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = start
+
+    def decide(self):
+        """
+        Returns the next variable to decide on, or None if all are set.
+        """
+        while self.order:
+            _, v = heapq.heappop(self.order)
+            if self.values[v] is None:
+                return v
+        return None
+
+    def solve(self):
+        """
+        Returns True if the clauses have a model, which is then kept in
+        self.model as a list of values by variable (from index 1), and
+        False if they have none.
+        """
+        if not self.ok:
+            return False
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+        restart = 1
+        budget = RESTART_BASE * luby(restart)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                budget -= 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.watch(learned)
+                    self.learned.append(learned)
+                    self.assign(learned[0], learned)
+                self.bump /= ACTIVITY_DECAY
+            elif budget <= 0:
+                self.restarts += 1
+                restart += 1
+                budget = RESTART_BASE * luby(restart)
+                self.backtrack(0)
+            else:
+                v = self.decide()
+                if v is None:
+                    self.model = list(self.values)
+                    self.backtrack(0)
+                    return True
+                self.decisions += 1
+                self.limits.append(len(self.trail))
+                self.assign(v if self.phases[v] else -v, None)
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, by looking for a model of
+    knowledge ∧ ¬query.
+    """
+    clauses = CNF()
+    clauses.add(knowledge)
+    clauses.add(Not(query))
+    return not Solver(clauses.clauses).solve()